@@ -0,0 +1,166 @@
+"""
+Single-file archive of a loaded sweep.
+
+All cases of an :class:`batch.sets.Actual` are packed into one chunked, compressed HDF5 file, with one group per
+system::
+
+    /<system>/parameters    n_cases x n_parameters parameter table (column names in the ``names`` attribute)
+    /<system>/case_info     JSON record of each case: name, path, parameter values and ``path_to_sys``
+    /<system>/<data>/       ragged data of every case: ``data``, ``offsets`` and ``shapes``
+    /<system>/ss/<i_case>/  state-space of a case, see :func:`linear.statespace.write_statespace`
+
+where ``<data>`` is any of the loaded ``eigs``, ``deflection``, ``crv``, ``aero_forces``, ``aero_moments``,
+``bode_wv`` and ``bode_yfreq``. Each ragged field is read back with a single bulk read. State-spaces are read back as
+:class:`linear.statespace.LazyStateSpace` backed by the archive, so their matrices are only read when accessed and
+SHARPy is not needed to load an archive.
+"""
+import json
+import numpy as np
+from individual.case import Case
+from linear.statespace import Bode, LazyStateSpace, write_statespace_group
+
+ARRAY_DATA = ['eigs', 'deflection', 'crv', 'aero_forces', 'aero_moments']
+#: Tables read with np.loadtxt, which are 1-D when they have a single row. They are archived as 2-D arrays.
+TABLE_DATA = ['eigs', 'aero_forces', 'aero_moments']
+
+
+def save(actual, path, compression='gzip'):
+    """
+    Writes every case loaded in ``actual`` to an archive. Only data that has already been loaded is written.
+    Single-row ``eigs``, ``aero_forces`` and ``aero_moments`` tables are stored, and read back, as 2-D arrays.
+
+    Args:
+        actual (batch.sets.Actual): Loaded sweep.
+        path (str): Path to the archive file.
+        compression (str (optional)): h5py compression filter.
+    """
+    import h5py as h5
+
+    with h5.File(path, 'w') as f:
+        f.attrs['systems'] = json.dumps(actual.systems)
+        for sys in actual.systems:
+            cases = actual.cases[sys].cases
+            grp = f.create_group(sys)
+
+            parameters = grp.create_dataset('parameters', data=actual.cases[sys].parameters.values)
+            parameters.attrs['names'] = json.dumps(actual.cases[sys].parameters.names)
+
+            case_info = [json.dumps({'name': case.name,
+                                     'path': case.path,
+                                     'parameters': {k: str(v) for k, v in zip(case.parameter_name,
+                                                                              actual.cases[sys].parameter_values[i])},
+                                     'path_to_sys': dict(case.path_to_sys)}) for i, case in enumerate(cases)]
+            grp.create_dataset('case_info', data=np.array(case_info, dtype=object), dtype=h5.string_dtype())
+
+            for name in ARRAY_DATA:
+                arrays = [getattr(case, '_' + name) for case in cases]
+                if name in TABLE_DATA:
+                    arrays = [np.atleast_2d(array) if array is not None else None for array in arrays]
+                write_ragged(grp, name, arrays, compression)
+
+            bodes = [case._bode for case in cases]
+            write_ragged(grp, 'bode_wv', [bode.wv if bode is not None else None for bode in bodes], compression)
+            write_ragged(grp, 'bode_yfreq', [bode.yfreq[()] if bode is not None else None for bode in bodes],
+                         compression)
+
+            for i_case, case in enumerate(cases):
+                ss = case._ss
+                if ss is not None:
+                    write_statespace_group(grp.create_group('ss/{:d}'.format(i_case)), ss.A, ss.B, ss.C, ss.D,
+                                           dt=ss.dt, compression=compression)
+
+
+def load(actual, path):
+    """
+    Adds the cases in an archive to the sets of ``actual``.
+
+    Args:
+        actual (batch.sets.Actual): Sweep into which to load the cases.
+        path (str): Path to the archive file.
+    """
+    import h5py as h5
+
+    with h5.File(path, 'r') as f:
+        for sys in json.loads(f.attrs['systems']):
+            grp = f[sys]
+
+            param_name = json.loads(grp['parameters'].attrs['names'])
+            case_info = [json.loads(entry) for entry in grp['case_info'].asstr()[()]]
+
+            data = {name: read_ragged(grp, name) for name in ARRAY_DATA}
+            wv = read_ragged(grp, 'bode_wv')
+            yfreq = read_ragged(grp, 'bode_yfreq')
+            state_spaces = grp['ss'] if 'ss' in grp else dict()
+
+            for i_case, info in enumerate(case_info):
+                param_value = list(info['parameters'].values())
+                case = Case(param_value, sys, path_to_data=info['path'], parameter_name=param_name)
+                case.name = info['name']
+                case.path_to_sys.update(info['path_to_sys'])
+
+                for name in ARRAY_DATA:
+                    setattr(case, name, data[name][i_case])
+                if wv[i_case] is not None:
+                    case.bode = Bode(wv[i_case], yfreq[i_case])
+                if str(i_case) in state_spaces:
+                    case.ss = LazyStateSpace(path, '{:s}/ss/{:d}'.format(sys, i_case))
+
+                actual.cases[sys].add_case(param_value, case, info['parameters'])
+
+
+def write_ragged(grp, name, arrays, compression=None):
+    """
+    Writes a list of arrays with the same number of dimensions (at least one) but different shapes as a single flat
+    dataset.
+
+    Raises:
+        ValueError: if the arrays have different numbers of dimensions.
+
+    Missing entries (``None``) are recorded with a shape of ``-1``.
+    """
+    present = [array for array in arrays if array is not None]
+    if len(present) == 0:
+        return
+
+    ndim = np.ndim(present[0])
+    if any(np.ndim(array) != ndim for array in present):
+        raise ValueError('The {:s} arrays have different numbers of dimensions'.format(name))
+    shapes = np.array([np.shape(array) if array is not None else (-1,) * ndim for array in arrays],
+                      dtype=int).reshape(len(arrays), ndim)
+    sizes = np.where(shapes[:, 0] == -1, 0, np.prod(shapes, axis=1))
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+    data = np.concatenate([np.ravel(array) for array in present])
+    sub_grp = grp.create_group(name)
+    if data.size > 0:
+        sub_grp.create_dataset('data', data=data, chunks=True, compression=compression)
+    else:
+        sub_grp.create_dataset('data', data=data)
+    sub_grp.create_dataset('offsets', data=offsets)
+    sub_grp.create_dataset('shapes', data=shapes)
+
+
+def read_ragged(grp, name):
+    """
+    Reads a dataset written with :func:`write_ragged`.
+
+    Returns:
+        list: Arrays, ``None`` for missing entries or if the dataset does not exist.
+    """
+    try:
+        sub_grp = grp[name]
+    except KeyError:
+        return [None] * grp['parameters'].shape[0]
+
+    data = sub_grp['data'][()]
+    offsets = sub_grp['offsets'][()]
+    shapes = sub_grp['shapes'][()]
+
+    arrays = []
+    for i_entry, shape in enumerate(shapes):
+        if shape[0] == -1:
+            arrays.append(None)
+        else:
+            arrays.append(data[offsets[i_entry]:offsets[i_entry + 1]].reshape(shape))
+    return arrays
+
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class EigenvalueStack:
+    """
+    Eigenvalues of every case in a set stacked in a single padded array.
+
+    Attributes:
+        eigs (np.ndarray): Eigenvalues of shape ``n_cases x max_n_eigs x 2`` (real and imaginary parts), padded with
+            ``np.nan``.
+        mask (np.ndarray): Boolean array of shape ``n_cases x max_n_eigs``, ``True`` for valid entries.
+        n_eigs (np.ndarray): Number of eigenvalues of each case.
+        parameters (batch.parameters.ParameterTable): Parameters of the cases, one row per case.
+
+    Args:
+        set_of_cases (batch.sets.SetOfCases): Cases whose eigenvalues to stack. Eigenvalues are loaded as needed.
+    """
+    def __init__(self, set_of_cases):
+        self.parameters = set_of_cases.parameters
+
+        eigs_list = [case.eigs for case in set_of_cases.cases]
+        eigs_list = [np.atleast_2d(eigs) if eigs is not None else np.zeros((0, 2)) for eigs in eigs_list]
+
+        self.n_eigs = np.array([eigs.shape[0] for eigs in eigs_list], dtype=int)
+        max_n_eigs = self.n_eigs.max() if len(self.n_eigs) > 0 else 0
+
+        self.mask = np.arange(max_n_eigs)[None, :] < self.n_eigs[:, None]
+        self.eigs = np.full((len(eigs_list), max_n_eigs, 2), np.nan)
+        if self.mask.any():
+            self.eigs[self.mask] = np.concatenate(eigs_list)
+
+    @property
+    def n_cases(self):
+        return self.eigs.shape[0]
+
+    def __getitem__(self, rows):
+        return self.eigs[rows], self.mask[rows]
+
+    def rows(self, **bounds):
+        """Rows of the cases within the given parameter bounds, see :meth:`ParameterTable.range`"""
+        return self.parameters.range(**bounds)
+
+    def mode_mask(self, n_modes=None, wdmin=None, wdmax=None):
+        """
+        Mask of the valid eigenvalues that satisfy the given filters.
+
+        Args:
+            n_modes (int (optional)): Keep only the first ``n_modes`` eigenvalues of each case.
+            wdmin (float (optional)): Minimum imaginary part.
+            wdmax (float (optional)): Maximum imaginary part.
+
+        Returns:
+            np.ndarray: Boolean array of shape ``n_cases x max_n_eigs``.
+        """
+        mask = self.mask.copy()
+        if n_modes is not None:
+            mask[:, n_modes:] = False
+        with np.errstate(invalid='ignore'):
+            if wdmin is not None:
+                mask &= self.eigs[:, :, 1] > wdmin
+            if wdmax is not None:
+                mask &= self.eigs[:, :, 1] < wdmax
+        return mask
+
+    def root_locus(self, n_modes=None, wdmin=None, wdmax=None, **bounds):
+        """
+        Flat list of eigenvalues and the parameters of their case, e.g. to plot root loci.
+
+        Args:
+            n_modes (int (optional)): Keep only the first ``n_modes`` eigenvalues of each case.
+            wdmin (float (optional)): Minimum imaginary part.
+            wdmax (float (optional)): Maximum imaginary part.
+            **bounds: Parameter bounds of the cases to include, see :meth:`ParameterTable.range`.
+
+        Returns:
+            tuple: Parameter array of shape ``n x n_parameters`` and eigenvalue array of shape ``n x 2``.
+        """
+        mask = self.mode_mask(n_modes=n_modes, wdmin=wdmin, wdmax=wdmax)
+        if len(bounds) > 0:
+            in_bounds = np.zeros(self.n_cases, dtype=bool)
+            in_bounds[self.rows(**bounds)] = True
+            mask &= in_bounds[:, None]
+
+        case_index, eig_index = np.nonzero(mask)
+        return self.parameters.values[case_index], self.eigs[case_index, eig_index]
@@ -0,0 +1,126 @@
+"""
+Reading of the ``.pmor.sharpy`` headers of the source cases and of ``pmor_summary.txt``.
+
+These are configobj files of which only flat ``key = value`` sections are needed. They are read here with a plain
+line parser, which only parses the requested sections. Files with syntax the parser does not handle (subsections,
+lists, quoted or multi-line values...) are read with ``configobj`` instead, which gives the same result.
+"""
+import configobj
+import numpy as np
+from batch.parameters import ParameterTable
+
+SOURCE_SECTIONS = ('parameters', 'sim_info')  #: sections of a .pmor.sharpy file used by the loaders
+
+
+class HeaderSyntaxError(ValueError):
+    """Syntax not handled by :func:`parse_header`"""
+    pass
+
+
+class Header(dict):
+    """
+    Sections of a header file as a ``name: {key: value}`` dictionary of strings, with the same interface as the
+    ``configobj.ConfigObj`` used by the loaders.
+
+    Attributes:
+        filename (str): Path to the file.
+    """
+    def __init__(self, filename):
+        super().__init__()
+        self.filename = filename
+
+
+def read_header(path, sections=None):
+    """
+    Reads the sections of a header file, falling back to ``configobj`` if :func:`parse_header` cannot.
+
+    Args:
+        path (str): Path to the file.
+        sections (tuple (optional)): Names of the sections to read. All sections if not given.
+
+    Returns:
+        Header or configobj.ConfigObj: Header sections.
+    """
+    try:
+        return parse_header(path, sections)
+    except HeaderSyntaxError:
+        return configobj.ConfigObj(path)
+
+
+def parse_header(path, sections=None):
+    """
+    Parses the flat sections of a configobj file.
+
+    Args:
+        path (str): Path to the file.
+        sections (tuple (optional)): Names of the sections to read. Lines of other sections are skipped without
+            being parsed. All sections if not given.
+
+    Returns:
+        Header: Header sections.
+
+    Raises:
+        HeaderSyntaxError: if a requested section has syntax that needs configobj.
+        OSError: if the file cannot be read.
+    """
+    header = Header(path)
+    current = None
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+
+            if line[0] == '[':
+                if line.startswith('[['):
+                    if current is not None:
+                        raise HeaderSyntaxError('Subsection in {:s}'.format(path))
+                    continue
+                name = line[1:line.find(']')].strip() if ']' in line else None
+                if not name or "'" in name or '"' in name:
+                    raise HeaderSyntaxError('Unable to parse section {:s} in {:s}'.format(line, path))
+                if sections is None or name in sections:
+                    if name in header:
+                        raise HeaderSyntaxError('Repeated section {:s} in {:s}'.format(name, path))
+                    current = header[name] = dict()
+                else:
+                    current = None
+                continue
+
+            if current is None:
+                if sections is None:
+                    raise HeaderSyntaxError('Value outside a section in {:s}'.format(path))
+                continue
+
+            key, equals, value = line.partition('=')
+            key = key.strip()
+            value = value.split('#', 1)[0].strip()
+            if not equals or not key or key in current or _special(key) or _special(value) or ',' in value:
+                raise HeaderSyntaxError('Unable to parse {:s} in {:s}'.format(line, path))
+            current[key] = value
+
+    return header
+
+
+def _special(text):
+    return "'" in text or '"' in text or text.endswith('\\')
+
+
+def parameter_table(headers):
+    """
+    Builds the parameter table of a list of headers, without creating any case.
+
+    Args:
+        headers (list): Headers of the source cases, see :func:`batch.sets.read_source_header`. ``None`` entries
+            are skipped.
+
+    Returns:
+        batch.parameters.ParameterTable: One row per header.
+    """
+    rows = [header['parameters'] for header in headers if header is not None]
+    if len(rows) == 0:
+        return ParameterTable()
+
+    table = ParameterTable(rows[0].keys())
+    table.extend(np.array([[row[name] for name in table.names] for row in rows], dtype=float))
+    return table
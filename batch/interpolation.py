@@ -1,6 +1,16 @@
-from batch.sets import SetOfCases, Actual
+from batch.sets import SetOfCases, Actual, CaseExecutor
+from batch.results import frame_columns, last_row, stack_results
 from individual.case import Case
-import configobj
+from batch.headers import read_header
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#: Templates of the paths to the data of an interpolated case, see individual.case.CasePaths
+INTERPOLATED_PATHS = {'eigs': '{path}/stability/{name}/{system}/_eigenvalues.dat',
+                      'freqresp': '{path}/frequencyresponse/{name}/{system}/freqresp.h5',
+                      'ss': '{path}/statespace/{name}/{system}/statespace.h5'}
 
 
 class Interpolated(Actual):
@@ -10,11 +20,25 @@ class Interpolated(Actual):
 
         self.parameter_name = parameter_name
 
-        self.data = configobj.ConfigObj(self.path + 'pmor_summary.txt')
+        self.data = read_header(self.path + 'pmor_summary.txt')
+
+    def load_bulk_cases(self, *args, replace_dir=None, append=False, workers=None, executor='thread', systems=None,
+                        **kwargs):
+        """
+        Loads the interpolated ROMs listed in ``pmor_summary.txt``.
 
-    def load_bulk_cases(self, *args, replace_dir=None, append=False, **kwargs):
+        The paths to the eigenvalues, frequency response and state-space of every case are set such that any data
+        not requested in ``*args`` (``'eigs'``, ``'bode'`` or ``'ss'``) is read on its first access. See
+        :meth:`batch.sets.Actual.load_bulk_cases` for the ``workers``, ``executor`` and ``systems`` arguments.
+        """
+        cache = kwargs.get('cache', None)
+        lazy = kwargs.get('lazy', True)
+        self.stats = kwargs.get('stats', self.stats)
+        if systems is None:
+            systems = self.systems
 
         n_loaded_cases = 0
+        new_cases = []
         for ith, case_number in enumerate(self.data):
             # item is the dict where the parameter_name is the key
             # single parameter cases only:
@@ -27,25 +51,287 @@ class Interpolated(Actual):
                 self.parameter_name.append(k)
                 param_value.append(v)
 
-            for sys in self.systems:
+            for sys in systems:
                 case = Case(self.data[case_number].values(), sys, parameter_name=self.parameter_name, path_to_data=self.path,
-                            case_info=self.data[case_number])
+                            path_templates=INTERPOLATED_PATHS, cache=cache, lazy=lazy, stats=self.stats)
+                case.name = 'param_case{:02g}'.format(ith)
 
-                if 'eigs' in args:
-                    case.path_to_sys['eigs'] = self.path + '/stability/param_case{:02g}/{:s}/_eigenvalues.dat'.format(ith,
-                                                                                                                  sys)
-                    case.load_eigs()
+                new_cases.append((param_value, case, self.data[case_number], None))
+            n_loaded_cases += 1
 
-                if 'bode' in args:
-                    case.path_to_sys[
-                        'freqresp'] = self.path + '/frequencyresponse/param_case{:02g}/{:s}/freqresp.h5'.format(ith, sys)
-                    case.load_bode()
+        with CaseExecutor(workers, executor) as pool:
+            self.add_cases(new_cases, [arg for arg in args if arg in ['eigs', 'bode', 'ss']], pool)
+        logger.info('Loaded {} cases'.format(n_loaded_cases))
 
-                if 'ss' in args:
-                    case.path_to_sys['ss'] = self.path + '/statespace/param_case{:02g}/{:s}/statespace.h5'.format(ith, sys)
 
-                    case.load_ss()
+class ParameterInterpolator:
+    """
+    Interpolation of case results at points of the parameter space that were not simulated.
 
-                self.cases[sys].add_case(param_value, case, self.data[case_number])
-            n_loaded_cases += 1
-        print('Loaded {} cases'.format(n_loaded_cases))
+    The interpolation structure is built once from the parameter table of the set and every query is answered as a
+    weighted sum of the results of the enclosing cases, with the same weights for every quantity:
+
+        * If the cases form a full tensor grid over the interpolation parameters (which includes a single parameter
+          sweep), the interpolation is multilinear between the ``2^d`` corners of the enclosing grid cell.
+
+        * Otherwise the parameters, scaled to their range, are triangulated with ``scipy.spatial.Delaunay`` and the
+          interpolation is linear (barycentric) within the enclosing simplex.
+
+    Results at points outside the grid or the convex hull of the cases are ``np.nan``.
+
+    Results are gathered from the cases on their first query and kept, so the interpolator is a snapshot of the set:
+    create a new one once cases are added.
+
+    Args:
+        set_of_cases (batch.sets.SetOfCases): Cases to interpolate.
+        parameters (list (optional)): Names of the interpolation parameters. Defaults to those that vary among the
+            selected cases.
+        method (str): ``'auto'``, ``'grid'`` or ``'scattered'``.
+        **bounds: Parameter bounds selecting the cases to interpolate (e.g. fixing the other parameters), see
+            :meth:`batch.parameters.ParameterTable.range`.
+
+    Attributes:
+        rows (np.ndarray): Rows of the interpolated cases in the set.
+        bounds (dict): Parameter bounds selecting the cases.
+        parameters (list): Names of the interpolation parameters, in the order of the columns of the query points.
+        method (str): ``'grid'`` or ``'scattered'``.
+    """
+    def __init__(self, set_of_cases, parameters=None, method='auto', **bounds):
+        self.set_of_cases = set_of_cases
+        self.bounds = bounds
+        self.rows = set_of_cases.parameters.range(**bounds)
+        table_values = set_of_cases.parameters.values[self.rows]
+
+        if parameters is None:
+            parameters = [name for i_column, name in enumerate(set_of_cases.parameters.names)
+                          if len(np.unique(table_values[:, i_column])) > 1]
+        if len(parameters) == 0:
+            raise ValueError('At least two cases with different parameters are required')
+        self.parameters = list(parameters)
+
+        points = table_values[:, [set_of_cases.parameters.names.index(name) for name in self.parameters]]
+        self._lower = points.min(axis=0)
+        self._scale = np.where(np.ptp(points, axis=0) > 0, np.ptp(points, axis=0), 1.)
+        points = (points - self._lower) / self._scale
+
+        self._grid_axes = None
+        self._grid_rows = None
+        self._triangulation = None
+        if method in ['auto', 'grid']:
+            self._build_grid(points)
+        if self._grid_axes is None:
+            if method == 'grid':
+                raise ValueError('The cases do not form a full grid over {}'.format(self.parameters))
+            self._build_triangulation(points)
+        self.method = 'grid' if self._grid_axes is not None else 'scattered'
+
+        self._data = dict()  #: gathered results by quantity
+
+    def weights(self, points):
+        """
+        Cases and weights whose sum gives the interpolated results.
+
+        Args:
+            points (np.ndarray or dict): Query points of shape ``m x n_parameters``, in the order of
+                :attr:`parameters`, or a ``name: values`` dictionary.
+
+        Returns:
+            tuple: Positions in :attr:`rows` of the cases of shape ``m x k``, their weights of shape ``m x k`` and a
+            boolean array of shape ``m`` which is ``True`` for points outside the interpolation domain.
+        """
+        points = (self._points(points) - self._lower) / self._scale
+        if self._grid_axes is not None:
+            return self._grid_weights(points)
+        return self._simplex_weights(points)
+
+    def interpolate(self, data, points):
+        """
+        Interpolates results given for every case.
+
+        Args:
+            data (np.ndarray): Results of shape ``n_cases x ...``, in the order of :attr:`rows`.
+            points (np.ndarray or dict): Query points, see :meth:`weights`.
+
+        Returns:
+            np.ndarray: Interpolated results of shape ``m x ...``.
+        """
+        indices, weights, outside = self.weights(points)
+        values = data[indices]
+        weights = weights.reshape(weights.shape + (1,) * (values.ndim - 2))
+        # cases with no weight do not contribute, even with missing results
+        result = np.sum(np.where(weights == 0, 0., weights * values), axis=1)
+        result[outside] = np.nan
+        return result
+
+    def deflection(self, points, reference_line=np.array([0, 0, 0.]), nodes=-1):
+        """
+        Interpolated deflection of a line offset from the beam, see :meth:`individual.case.Case.get_deflection_at_line`.
+
+        Args:
+            points (np.ndarray or dict): Query points, see :meth:`weights`.
+            reference_line (np.ndarray): Offset of the line from the beam, in the node frame.
+            nodes (int or array-like (optional)): Nodes at which to interpolate, the tip by default. All nodes if
+                ``None``.
+
+        Returns:
+            np.ndarray: Deflection of shape ``m x 3`` (or ``m x n_nodes x 3``).
+        """
+        key = ('deflection', tuple(np.ravel(reference_line)), nodes if np.isscalar(nodes) or nodes is None
+               else tuple(nodes))
+        if key not in self._data:
+            self._data[key] = self._gather(lambda case: case.get_deflection_at_line(reference_line,
+                                                                                    nodes=nodes)[..., -3:])
+        return self.interpolate(self._data[key], points)
+
+    def forces(self, points, frame='g'):
+        """
+        Interpolated aerodynamic forces in the ``'g'`` or ``'a'`` frame, of shape ``m x 3``.
+        """
+        return self.interpolate(self._force_data('aero_forces', frame), points)
+
+    def moments(self, points, frame='g'):
+        """
+        Interpolated aerodynamic moments in the ``'g'`` or ``'a'`` frame, of shape ``m x 3``.
+        """
+        return self.interpolate(self._force_data('aero_moments', frame), points)
+
+    def bode(self, points):
+        """
+        Interpolated frequency response magnitude and phase.
+
+        The magnitude (in dB) and the phase, unwrapped along the frequency, are interpolated separately. All cases
+        must share the same frequency vector.
+
+        Returns:
+            tuple: Frequency vector, magnitude and phase of shape ``m x p x m_inputs x n_freq``.
+        """
+        if 'bode' not in self._data:
+            wv = None
+            for case in self._cases():
+                if case.bode is not None:
+                    if wv is not None and not np.array_equal(wv, case.bode.wv):
+                        raise ValueError('The cases do not share the same frequency vector')
+                    wv = np.asarray(case.bode.wv)
+            self._data['bode'] = (wv,
+                                  self._gather(lambda case: case.bode.mag),
+                                  self._gather(lambda case: np.unwrap(case.bode.phase, axis=-1)))
+
+        wv, mag, phase = self._data['bode']
+        return wv, self.interpolate(mag, points), self.interpolate(phase, points)
+
+    def eigenvalues(self, points, **kwargs):
+        """
+        Interpolated eigenvalues of each tracked branch, for a single interpolation parameter.
+
+        Args:
+            points (np.ndarray or dict): Query points, see :meth:`weights`.
+            **kwargs: Settings of the :class:`batch.tracking.ModeTracker` along the interpolation parameter. The
+                tracker selects the same cases as the interpolator through :attr:`bounds`.
+
+        Returns:
+            np.ndarray: Eigenvalues of shape ``m x n_branches x 2``, ``np.nan`` where a branch does not exist at both
+            ends of the enclosing interval.
+        """
+        if len(self.parameters) != 1:
+            raise ValueError('Eigenvalue branches can only be interpolated along a single parameter')
+
+        settings = dict(self.bounds, **kwargs)
+        key = ('eigenvalues', tuple((name, tuple(value) if isinstance(value, list) else value)
+                                    for name, value in sorted(settings.items())))
+        if key not in self._data:
+            tracker = self.set_of_cases.track_modes(parameter=self.parameters[0], **settings)
+            branches = np.full((len(self.rows), tracker.branches.shape[1], 2), np.nan)
+            position = np.searchsorted(self.rows, tracker.rows)
+            found = position < len(self.rows)
+            found[found] = self.rows[position[found]] == tracker.rows[found]
+            branches[position[found]] = tracker.branches[found]
+            self._data[key] = branches
+        return self.interpolate(self._data[key], points)
+
+    def _cases(self):
+        return [self.set_of_cases(row) for row in self.rows]
+
+    def _gather(self, result):
+        """
+        Stacks ``result(case)`` for every case, with ``np.nan`` for cases whose data is missing.
+        """
+        values = []
+        for case in self._cases():
+            try:
+                values.append(result(case))
+            except (TypeError, AttributeError):
+                values.append(None)
+        return stack_results(values, name='interpolation data')
+
+    def _force_data(self, name, frame):
+        columns = frame_columns(frame)
+        key = (name, frame)
+        if key not in self._data:
+            self._data[key] = self._gather(lambda case: last_row(getattr(case, name))[columns])
+        return self._data[key]
+
+    def _points(self, points):
+        if isinstance(points, dict):
+            return np.column_stack(np.broadcast_arrays(*[np.asarray(points[name], dtype=float).ravel()
+                                                         for name in self.parameters]))
+        points = np.asarray(points, dtype=float)
+        return points.reshape(-1, len(self.parameters))
+
+    def _build_grid(self, points):
+        axes = [np.unique(points[:, i_dim]) for i_dim in range(points.shape[1])]
+        if np.prod([len(axis) for axis in axes]) != points.shape[0] or min(len(axis) for axis in axes) < 2:
+            return
+
+        position = tuple(np.searchsorted(axis, points[:, i_dim]) for i_dim, axis in enumerate(axes))
+        grid_rows = np.full([len(axis) for axis in axes], -1)
+        grid_rows[position] = np.arange(points.shape[0])
+        if np.any(grid_rows == -1):
+            return  # repeated points
+        self._grid_axes = axes
+        self._grid_rows = grid_rows
+
+    def _grid_weights(self, points):
+        n_points, n_dim = points.shape
+        lower = []
+        fraction = []
+        outside = np.zeros(n_points, dtype=bool)
+        for i_dim, axis in enumerate(self._grid_axes):
+            x = points[:, i_dim]
+            i_lower = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            lower.append(i_lower)
+            fraction.append((x - axis[i_lower]) / (axis[i_lower + 1] - axis[i_lower]))
+            outside |= ~((x >= axis[0]) & (x <= axis[-1]))
+
+        corners = np.array(np.meshgrid(*[[0, 1]] * n_dim, indexing='ij')).reshape(n_dim, -1).T
+        indices = np.empty((n_points, len(corners)), dtype=int)
+        weights = np.ones((n_points, len(corners)))
+        for i_corner, corner in enumerate(corners):
+            indices[:, i_corner] = self._grid_rows[tuple(lower[i_dim] + corner[i_dim] for i_dim in range(n_dim))]
+            for i_dim in range(n_dim):
+                weights[:, i_corner] *= fraction[i_dim] if corner[i_dim] else 1 - fraction[i_dim]
+
+        indices[outside] = 0
+        return indices, weights, outside
+
+    def _build_triangulation(self, points):
+        try:
+            from scipy.spatial import Delaunay
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError('Interpolation of scattered cases requires scipy')
+        if points.shape[1] < 2:
+            raise ValueError('Repeated parameter values, select the cases to interpolate with bounds')
+        self._triangulation = Delaunay(points)
+
+    def _simplex_weights(self, points):
+        n_dim = points.shape[1]
+        simplex = self._triangulation.find_simplex(points)
+        outside = simplex == -1
+        simplex[outside] = 0
+
+        transform = self._triangulation.transform[simplex]
+        barycentric = np.einsum('mij,mj->mi', transform[:, :n_dim], points - transform[:, n_dim])
+        weights = np.column_stack((barycentric, 1 - barycentric.sum(axis=1)))
+        indices = self._triangulation.simplices[simplex]
+
+        indices[outside] = 0
+        return indices, weights, outside
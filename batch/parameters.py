@@ -0,0 +1,205 @@
+import numpy as np
+
+
+class ParameterTable:
+    """
+    Columnar table of the parameters of a set of cases.
+
+    The parameters are stored in a 2-D float array of shape ``n_cases x n_parameters`` with named columns. Rows are
+    hashed for exact lookups and each column keeps a sorted index, built on demand, for range and nearest-neighbour
+    queries.
+
+    Args:
+        names (list (optional)): Parameter names. If not given, they are taken from the first row appended.
+    """
+    def __init__(self, names=None):
+        self.names = list(names) if names is not None else None
+
+        self._values = np.zeros((0, len(self.names) if self.names is not None else 0))
+        self._n_rows = 0
+
+        self._index = dict()  #: row values to row number
+        self._sorted = dict()  #: column number to (row order, sorted column values)
+
+    def __len__(self):
+        return self._n_rows
+
+    @property
+    def values(self):
+        """np.ndarray: Parameter array of shape ``n_cases x n_parameters``"""
+        return self._values[:self._n_rows]
+
+    def column(self, name):
+        return self.values[:, self.names.index(name)]
+
+    def append(self, values, names=None):
+        """
+        Adds a row to the table.
+
+        Args:
+            values (list or dict): Parameter values, in the order of ``names`` or as a ``name: value`` dictionary.
+            names (list (optional)): Names of the given values if they are not in the order of the table columns.
+
+        Returns:
+            int: Row number
+        """
+        if isinstance(values, dict):
+            names = list(values.keys())
+            values = list(values.values())
+
+        if self.names is None:
+            self.names = list(names) if names is not None else ['param{:g}'.format(i) for i in range(len(values))]
+            self._values = np.zeros((0, len(self.names)))
+
+        row = self._row(values, names)
+
+        if self._n_rows == self._values.shape[0]:
+            self._values = np.concatenate((self._values, np.zeros((max(16, self._n_rows), len(self.names)))))
+        self._values[self._n_rows] = row
+
+        self._index.setdefault(tuple(row), self._n_rows)
+        self._sorted.clear()
+        self._n_rows += 1
+
+        return self._n_rows - 1
+
+    def extend(self, values):
+        """
+        Adds several rows to the table at once.
+
+        Args:
+            values (np.ndarray): Parameter values of shape ``n_rows x n_parameters``, in the order of the table
+                columns.
+
+        Returns:
+            np.ndarray: Row numbers
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.names))
+
+        n_rows = self._n_rows + values.shape[0]
+        if n_rows > self._values.shape[0]:
+            self._values = np.concatenate((self._values[:self._n_rows],
+                                           np.zeros((max(16, n_rows), len(self.names)))))
+        self._values[self._n_rows:n_rows] = values
+
+        for i_row, row in enumerate(values, start=self._n_rows):
+            self._index.setdefault(tuple(row), i_row)
+        self._sorted.clear()
+        self._n_rows = n_rows
+
+        return np.arange(n_rows - values.shape[0], n_rows)
+
+    def find(self, values, names=None):
+        """
+        Exact lookup of a row.
+
+        Args:
+            values (list or dict): Parameter values, in the order of ``names`` or as a ``name: value`` dictionary.
+            names (list (optional)): Names of the given values if they are not in the order of the table columns.
+
+        Returns:
+            int: Number of the first row with the given parameters.
+
+        Raises:
+            KeyError: if no row has the given parameters.
+        """
+        if isinstance(values, dict):
+            names = list(values.keys())
+            values = list(values.values())
+
+        if self.names is None:
+            raise KeyError('The table is empty')
+        return self._index[tuple(self._row(values, names))]
+
+    def __contains__(self, values):
+        try:
+            self.find(values)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def range(self, **bounds):
+        """
+        Rows with parameters within the given bounds.
+
+        Args:
+            **bounds: ``name=(min, max)`` inclusive bounds or ``name=value`` for an exact match. ``None`` leaves a
+                bound open.
+
+        Returns:
+            np.ndarray: Row numbers, in ascending order.
+        """
+        candidates = None
+        for name, bound in bounds.items():
+            if not isinstance(bound, (tuple, list)):
+                bound = (bound, bound)
+            lower, upper = bound
+
+            order, sorted_column = self._sorted_column(self.names.index(name))
+            start = 0 if lower is None else np.searchsorted(sorted_column, lower, side='left')
+            end = len(sorted_column) if upper is None else np.searchsorted(sorted_column, upper, side='right')
+
+            rows = order[start:end]
+            if candidates is None:
+                candidates = rows
+            else:
+                candidates = np.intersect1d(candidates, rows, assume_unique=True)
+
+        if candidates is None:
+            return np.arange(self._n_rows)
+        return np.sort(candidates)
+
+    def nearest(self, k=1, scale=None, **values):
+        """
+        Rows nearest to the given parameters.
+
+        The distance is Euclidean over the given parameters, each divided by its ``scale``.
+
+        Args:
+            k (int): Number of rows to return.
+            scale (dict (optional)): ``name: scale`` used to normalise the parameters. Defaults to the range of
+                each column.
+            **values: ``name=value`` of the query point.
+
+        Returns:
+            np.ndarray: ``k`` row numbers, nearest first.
+        """
+        k = min(k, self._n_rows)
+        if k == 0:
+            return np.zeros(0, dtype=int)
+        if len(values) == 1 and k == 1:
+            # a single parameter can be found on the sorted index
+            name, value = list(values.items())[0]
+            order, sorted_column = self._sorted_column(self.names.index(name))
+            i_right = min(np.searchsorted(sorted_column, value), len(sorted_column) - 1)
+            i_left = max(i_right - 1, 0)
+            if abs(sorted_column[i_left] - value) <= abs(sorted_column[i_right] - value):
+                return order[[i_left]]
+            return order[[i_right]]
+
+        distance = np.zeros(self._n_rows)
+        for name, value in values.items():
+            column = self.column(name)
+            if scale is not None and name in scale:
+                column_scale = scale[name]
+            else:
+                column_scale = np.ptp(column) if np.ptp(column) > 0 else 1.
+            distance += ((column - value) / column_scale) ** 2
+
+        nearest = np.argpartition(distance, k - 1)[:k]
+        return nearest[np.argsort(distance[nearest])]
+
+    def _row(self, values, names=None):
+        if len(values) != len(self.names):
+            raise ValueError('Expected {:g} parameters, received {:g}'.format(len(self.names), len(values)))
+        if names is not None and list(names) != self.names:
+            values = [values[list(names).index(name)] for name in self.names]
+        return np.array(values, dtype=float)
+
+    def _sorted_column(self, column):
+        try:
+            return self._sorted[column]
+        except KeyError:
+            order = np.argsort(self.values[:, column], kind='stable')
+            self._sorted[column] = (order, self.values[order, column])
+            return self._sorted[column]
@@ -0,0 +1,164 @@
+import numpy as np
+import individual.rotation as rotation
+
+
+class ResultsTable:
+    """
+    Results of every case in a set gathered in contiguous arrays, sorted by the case parameters.
+
+    The cases are sorted lexicographically by the ``sort_by`` parameters, the first one being the primary key. Each
+    result is gathered from the cases on its first access and kept. The returned arrays are read-only views of the
+    stored ones. Cases whose data is missing give ``np.nan`` rows.
+
+    Args:
+        set_of_cases (batch.sets.SetOfCases): Cases whose results to gather. Data is loaded as needed.
+        sort_by (list (optional)): Parameter names by which to sort the cases. Defaults to all parameters, in the
+            order of the table columns.
+
+    Attributes:
+        order (np.ndarray): Row in the set of each case, in sorted order.
+        parameters (np.ndarray): Parameters of the sorted cases of shape ``n_cases x n_parameters``.
+    """
+    def __init__(self, set_of_cases, sort_by=None):
+        self.set_of_cases = set_of_cases
+
+        table = set_of_cases.parameters
+        if len(table) == 0:
+            self.order = np.zeros(0, dtype=int)
+        else:
+            if sort_by is None:
+                sort_by = table.names
+            # np.lexsort sorts by the last key first
+            self.order = np.lexsort([table.column(name) for name in reversed(sort_by)])
+        self.parameters = _read_only(table.values[self.order] if len(table) > 0 else np.zeros((0, 0)))
+
+        self._arrays = dict()
+
+    @property
+    def n_cases(self):
+        return len(self.order)
+
+    def aero_forces(self):
+        """Rows of ``forces/aeroforces.txt`` of every case"""
+        return self._gather('aero_forces', 'aero_forces', last_row)
+
+    def aero_moments(self):
+        return self._gather('aero_moments', 'aero_moments', last_row)
+
+    def forces(self, frame='g'):
+        """Aerodynamic forces in the ``'g'`` or ``'a'`` frame, of shape ``n_cases x 3``"""
+        return frame_loads(self.aero_forces(), frame)
+
+    def moments(self, frame='g'):
+        """Aerodynamic moments in the ``'g'`` or ``'a'`` frame, of shape ``n_cases x 3``"""
+        return frame_loads(self.aero_moments(), frame)
+
+    def tip_deflection(self):
+        """Position of the last beam node of every case, of shape ``n_cases x 3``"""
+        return self._gather('tip_deflection', 'deflection', lambda deflection: deflection[-1, -3:], shape=(3,))
+
+    def tip_crv(self):
+        """Rotation (CRV) of the last beam node of every case, of shape ``n_cases x 3``"""
+        return self._gather('tip_crv', 'crv', lambda crv: crv[-1], shape=(3,))
+
+    def wing_tip_deflection(self, frame='a', alpha=0, reference_line=np.array([0, 0, 0], dtype=float)):
+        """
+        Position of a line offset from the beam tip, rotated with the tip.
+
+        Args:
+            frame (str): ``'a'`` or ``'g'`` frame. The ``'g'`` frame is obtained by pitching the ``'a'`` frame by
+                ``alpha``.
+            alpha (float): Angle of attack in degrees.
+            reference_line (np.ndarray): Offset of the line from the beam, in the node frame. Cases without rotation
+                data are not offset.
+
+        Returns:
+            np.ndarray: Deflection of shape ``n_cases x 3``.
+        """
+        key = ('wing_tip_deflection', frame, float(alpha), tuple(np.ravel(reference_line).tolist()))
+        if key not in self._arrays:
+            tip_crv = self.tip_crv()
+            line_offset = rotation.rotate_crv(tip_crv, reference_line)
+            line_offset[np.isnan(tip_crv)] = 0
+            deflection = self.tip_deflection() + line_offset
+            if frame == 'g':
+                deflection = deflection.dot(rotation.pitch2rotation(alpha * np.pi / 180).T)
+            self._arrays[key] = _read_only(deflection)
+        return self._arrays[key]
+
+    def _gather(self, name, attribute, result, shape=(0,)):
+        """
+        Stacks ``result`` of the ``attribute`` data of every case, in sorted order. ``shape`` is that of the result
+        of a single case, used if no case has data.
+        """
+        if name not in self._arrays:
+            values = []
+            for row in self.order:
+                data = getattr(self.set_of_cases(row), attribute)
+                values.append(result(data) if data is not None else None)
+            self._arrays[name] = _read_only(stack_results(values, shape, name))
+        return self._arrays[name]
+
+
+def stack_results(values, shape=None, name='results'):
+    """
+    Stacks the results of several cases in a single array, with ``np.nan`` for the cases whose data is missing.
+
+    Args:
+        values (list): Result of each case, ``None`` where its data is missing.
+        shape (tuple (optional)): Shape of the result of a single case, used if no case has data.
+        name (str): Name of the results, for error messages.
+
+    Returns:
+        np.ndarray: Results of shape ``n_cases x shape``.
+
+    Raises:
+        ValueError: if the results have different shapes, or if no case has data and ``shape`` is not given.
+    """
+    values = [np.asarray(value, dtype=float) if value is not None else None for value in values]
+    shapes = {value.shape for value in values if value is not None}
+    if len(shapes) > 1:
+        raise ValueError('The {:s} of the cases have different shapes {}'.format(name, shapes))
+    if len(shapes) == 1:
+        shape = shapes.pop()
+    elif shape is None:
+        raise ValueError('No {:s} available'.format(name))
+
+    array = np.full((len(values),) + tuple(shape), np.nan)
+    for i_case, value in enumerate(values):
+        if value is not None:
+            array[i_case] = value
+    return array
+
+
+def last_row(table):
+    """Final row of a table read with ``np.loadtxt``, which is 1-D if it has a single row. ``None`` if ``table`` is"""
+    if table is None:
+        return None
+    return np.atleast_2d(table)[-1]
+
+
+def frame_columns(frame):
+    """Columns of the ``'g'`` or ``'a'`` frame components in a row of ``forces/aeroforces.txt``"""
+    if frame == 'g':
+        return slice(1, 4)
+    elif frame == 'a':
+        return slice(7, 10)
+    raise NameError('Frame can only be A or G')
+
+
+def frame_loads(loads, frame):
+    """
+    Components in the ``'g'`` or ``'a'`` frame of stacked rows of ``forces/aeroforces.txt``, of shape
+    ``n_cases x 3``.
+    """
+    columns = frame_columns(frame)
+    if loads.shape[1] == 0:
+        # no case has data
+        return _read_only(np.full((loads.shape[0], 3), np.nan))
+    return loads[:, columns]
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
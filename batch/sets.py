@@ -1,9 +1,33 @@
 from individual.case import Case
-from linear.stability import Stability
+from individual.instrumentation import LoadStats, NULL_STATS
+from linear.stability import Stability, StabilitySet
+from linear.statespace import bulk_freqresp
+from batch.parameters import ParameterTable
+from batch.headers import SOURCE_SECTIONS, read_header, parameter_table
+from batch.eigenvalues import EigenvalueStack
+from batch.results import ResultsTable
+from batch.tracking import ModeTracker
+import batch.archive
+import concurrent.futures
+import functools
 import glob
-import configobj
+import itertools
+import logging
+import os
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+#: Templates of the paths to the data of a source case, see individual.case.CasePaths
+SOURCE_PATHS = {'eigs': '{path}/stability/eigenvalues.dat',
+                'freqresp': '{path}/frequencyresponse/{system}.freqresp.h5',
+                'ss': '{path}/statespace/{system}.statespace.dat',
+                'WriteVariablesTime': '{path}/WriteVariablesTime/*',
+                'beam_modal_analysis': '{path}/beam_modal_analysis',
+                'AeroForcesCalculator': '{path}/forces/aeroforces.txt'}
+#: As SOURCE_PATHS, with eigenvalues saved by system
+SOURCE_PATHS_SYSTEM_EIGS = dict(SOURCE_PATHS, eigs='{path}/stability/{system}_eigenvalues.dat')
+
 
 class Actual:
     def __init__(self, path_to_source):
@@ -19,163 +43,556 @@ class Actual:
         self.aeroelastic = self.cases['aeroelastic']
 
         self.database = dict()
+        self.manifest = dict()  #: source directory to signature of its .pmor.sharpy file when it was ingested
+        self.stats = NULL_STATS  #: individual.instrumentation.LoadStats collected by the loaders
+
+    def load_bulk_cases(self, *args, replace_dir=None, append=False, workers=None, executor='thread', systems=None,
+                        **kwargs):
+        """
+        Loads the cases found at ``self.path`` into the aeroelastic, aerodynamic and structural sets.
+
+        The data to load is given by the ``*args``, i.e. ``'eigs'``, ``'bode'``, ``'deflection'``, ``'stability'``,
+        ``'beam_modal_analysis'``, ``'forces'`` or ``'ss'``.
+
+        Args:
+            replace_dir (str (optional)): Replace the root of the path to the source case data.
+            append (bool): Only read sources that are new or have changed since they were last loaded, according to
+                :attr:`manifest`. Cases of changed sources replace the loaded case with the same parameters, and
+                new cases whose parameters are already loaded are skipped.
+            workers (int (optional)): Number of workers among which to share the reading of the cases. If ``None``
+                the cases are read serially.
+            executor (str or concurrent.futures.Executor): ``'thread'`` or ``'process'`` pool, or an existing
+                executor to which the reading of the cases is submitted.
+            systems (list (optional)): Systems to load. Defaults to all of ``self.systems``.
+
+        Keyword Args:
+            eigs_legacy (bool): Read eigenvalues from ``stability/eigenvalues.dat`` rather than
+                ``stability/<system>_eigenvalues.dat``.
+            cache (individual.cache.CaseCache): Store of parsed data reused across sessions.
+            lazy (bool): Data not requested in ``*args`` is read on its first access (default ``True``).
+            stats (individual.instrumentation.LoadStats): Collect the time, files and bytes read and failures of
+                each loading stage, including later lazy loads. Kept in :attr:`stats`.
+
+        Cases are added to the sets in the same order, and with the same ``case_id``, regardless of the number of
+        workers.
+        """
+
+        self.stats = kwargs.get('stats', self.stats)
+        source_cases_name = self.find_sources(**kwargs)
+
+        if systems is None:
+            systems = self.systems
+
+        if append:
+            sources_to_read = [source for source in source_cases_name if self.source_changed(source)]
+        else:
+            sources_to_read = source_cases_name
 
-    def load_bulk_cases(self, *args, replace_dir=None, append=False, **kwargs):
+        with CaseExecutor(workers, executor) as pool:
+            headers = self.read_headers(sources_to_read, pool)
 
+            n_loaded_cases = 0
+            new_cases = []
+            for source, case_info in zip(sources_to_read, headers):
+                if case_info is None:
+                    continue
+                refreshed_source = source in self.manifest
+                self.manifest[source] = source_signature(source, case_info.filename)
+
+                self.param_name = []
+                param_value = []
+                for k, v in case_info['parameters'].items():
+                    self.param_name.append(k)
+                    param_value.append(v)
+
+                for sys in systems:
+                    replace_index = None
+                    if append and param_value in self.cases[sys].parameters:
+                        if not refreshed_source:
+                            continue
+                        replace_index = self.cases[sys].parameters.find(param_value)
+
+                    case = self.make_case(case_info, sys, replace_dir=replace_dir, **kwargs)
+                    new_cases.append((param_value, case, case_info['parameters'], replace_index))
+                n_loaded_cases += 1
+
+            self.add_cases(new_cases, args, pool)
+
+        logger.info('Loaded {} cases'.format(n_loaded_cases))
+        if n_loaded_cases == 0 and len(sources_to_read) > 0:
+            logger.warning('No cases loaded from {}'.format(sources_to_read))
+
+    def find_sources(self, **kwargs):
+        """
+        Source case directories, matching ``self.path`` or listed in the ``rom_library`` keyword argument.
+        """
         if kwargs.get('rom_library'):
-            source_cases_name = [entry['path_to_data'] for entry in kwargs['rom_library'].library]
+            return [entry['path_to_data'] for entry in kwargs['rom_library'].library]
+
+        with self.stats.stage('glob'):
+            return glob.glob(self.path)
+
+    def read_headers(self, sources, pool):
+        """
+        Reads the ``.pmor.sharpy`` file of each source through ``pool``. See :func:`read_source_header`.
+        """
+        if not self.stats.enabled:
+            return pool.map(read_source_header, sources)
+
+        headers = []
+        for case_info, stats in pool.map(read_source_header_stats, sources):
+            headers.append(case_info)
+            self.stats.merge(stats)
+        return headers
+
+    def read_parameters(self, workers=None, executor='thread', **kwargs):
+        """
+        Reads the parameters of the source cases from their headers only, without creating any case.
+
+        Args:
+            workers (int (optional)): Number of workers among which to share the reading of the headers.
+            executor (str or concurrent.futures.Executor): ``'thread'`` or ``'process'`` pool, or an existing
+                executor.
+            **kwargs: ``rom_library`` from which to take the sources, see :meth:`load_bulk_cases`.
+
+        Returns:
+            tuple: Sources with a header and the :class:`batch.parameters.ParameterTable` of their parameters, in the
+                same order.
+        """
+        sources = self.find_sources(**kwargs)
+        with CaseExecutor(workers, executor) as pool:
+            headers = self.read_headers(sources, pool)
+
+        sources = [source for source, header in zip(sources, headers) if header is not None]
+        return sources, parameter_table(headers)
+
+    def make_case(self, case_info, sys, replace_dir=None, **kwargs):
+        """
+        Creates the case of a system from the header of its source, with the paths to its data but no data loaded.
+
+        Args:
+            case_info (batch.headers.Header): Header of the source, see :func:`read_source_header`.
+            sys (str): System name.
+            replace_dir (str (optional)): Replace the root of the path to the source case data.
+            **kwargs: ``eigs_legacy``, ``cache`` and ``lazy`` settings, see :meth:`load_bulk_cases`.
+
+        Returns:
+            individual.case.Case: The new case.
+        """
+        if replace_dir is not None:
+            path_to_source_case = case_info['sim_info']['path_to_data'].replace('/home/ng213/sharpy_cases/',
+                                                                                '/home/ng213/2TB/')
         else:
-            source_cases_name = glob.glob(self.path)
+            path_to_source_case = case_info['sim_info']['path_to_data']
 
-        eigs_legacy = kwargs.get('eigs_legacy', True)
+        # asymtotic stability in dev_pmor has an extra setting to save aeroelastic_eigenvalues.dat
+        if kwargs.get('eigs_legacy', True):
+            path_templates = SOURCE_PATHS
+        else:
+            path_templates = SOURCE_PATHS_SYSTEM_EIGS
+
+        case = Case(case_info['parameters'].values(), sys, parameter_name=list(case_info['parameters'].keys()),
+                    path_to_data=path_to_source_case, path_templates=path_templates,
+                    cache=kwargs.get('cache', None), lazy=kwargs.get('lazy', True), stats=self.stats)
+        case.name = case_info['sim_info']['case']
+
+        return case
+
+    def stream(self, *args, batch_size=None, workers=None, executor='thread', systems=None, replace_dir=None,
+               **kwargs):
+        """
+        Yields the cases found at ``self.path`` straight from disk, without adding them to the sets.
+
+        Only the headers of the sources are read up front. The data requested in ``*args`` (see
+        :meth:`load_bulk_cases`) is then read for one batch of cases at a time, such that only a batch is held in
+        memory as long as the caller drops each case after use. Streamed cases have no ``case_id``.
+
+        Args:
+            batch_size (int (optional)): Yield lists of up to ``batch_size`` cases rather than single cases. The cases
+                of a batch are read concurrently when ``workers`` are given.
+            workers (int (optional)): Number of workers among which to share the reading of a batch.
+            executor (str or concurrent.futures.Executor): ``'thread'`` or ``'process'`` pool, or an existing
+                executor.
+            systems (list (optional)): Systems to stream. Defaults to all of ``self.systems``.
+            replace_dir (str (optional)): Replace the root of the path to the source case data.
+            **kwargs: Keyword arguments of :meth:`load_bulk_cases`.
+
+        Yields:
+            individual.case.Case: Cases in the same order as :meth:`load_bulk_cases` adds them, or lists of cases
+            if ``batch_size`` is given.
+        """
+        for cases in self._stream_batches(args, None, batch_size or 1, workers, executor, systems, replace_dir,
+                                          **kwargs):
+            if batch_size is None:
+                yield cases[0]
+            else:
+                yield cases
+
+    def map_reduce(self, func, *args, reduce=None, initial=None, batch_size=1, workers=None, executor='thread',
+                   systems=None, replace_dir=None, **kwargs):
+        """
+        Applies ``func`` to every case straight from disk and combines the results, in bounded memory.
+
+        ``func`` runs on the workers right after the case is read, such that only its result, not the case, is
+        returned from a worker process. It must be picklable to run on a process pool.
+
+        Args:
+            func (callable): Function of a case.
+            *args: Data to load onto each case before ``func`` is applied, see :meth:`load_bulk_cases`. Other data is
+                read lazily on access.
+            reduce (callable (optional)): Function of the accumulated value and the result of a case returning the
+                new accumulated value, e.g. ``operator.add``. If not given, the list of results is returned.
+            initial (optional): Initial accumulated value. Defaults to the result of the first case.
+            batch_size (int): Number of cases read at a time.
+            workers (int (optional)): Number of workers among which to share each batch.
+            executor (str or concurrent.futures.Executor): ``'thread'`` or ``'process'`` pool, or an existing
+                executor.
+            systems (list (optional)): Systems to include. Defaults to all of ``self.systems``.
+            replace_dir (str (optional)): Replace the root of the path to the source case data.
+            **kwargs: Keyword arguments of :meth:`load_bulk_cases`.
+
+        Returns:
+            The reduced value, or the list of the results of every case, in the order of :meth:`stream`.
+        """
+        results = []
+        accumulated = initial
+        started = initial is not None
+        for values in self._stream_batches(args, func, batch_size, workers, executor, systems, replace_dir, **kwargs):
+            if reduce is None:
+                results.extend(values)
+                continue
+            for value in values:
+                if started:
+                    accumulated = reduce(accumulated, value)
+                else:
+                    accumulated = value
+                    started = True
+
+        if reduce is None:
+            return results
+        return accumulated
+
+    def _stream_batches(self, args, func, batch_size, workers, executor, systems, replace_dir, **kwargs):
+        self.stats = kwargs.get('stats', self.stats)
+        if systems is None:
+            systems = self.systems
+        sources = self.find_sources(**kwargs)
+
+        with CaseExecutor(workers, executor) as pool:
+            headers = self.read_headers(sources, pool)
+            cases = (self.make_case(case_info, sys, replace_dir=replace_dir, **kwargs)
+                     for case_info in headers if case_info is not None for sys in systems)
+
+            apply = functools.partial(apply_to_case, args=args, func=func)
+            while True:
+                batch_cases = list(itertools.islice(cases, batch_size))
+                if len(batch_cases) == 0:
+                    return
+                values = []
+                for value, stats in pool.map(apply, batch_cases):
+                    self.stats.merge(stats)
+                    if func is None:
+                        value.stats = self.stats
+                    values.append(value)
+                yield values
+
+    def add_cases(self, new_cases, args, pool):
+        """
+        Loads the data requested in ``args`` onto the new cases through ``pool`` and merges them, in order, into the
+        sets.
+
+        Args:
+            new_cases (list): ``(param_value, case, param_dict, replace_index)`` tuples. Cases with a
+                ``replace_index`` replace the case at that position of their set.
+            args (tuple): Data to load, see :func:`load_case_data`.
+            pool (CaseExecutor): Workers among which the loading is shared.
+        """
+        loaded_cases = pool.map(functools.partial(load_case_data, args=args), [entry[1] for entry in new_cases])
+
+        for (param_value, _, param_dict, replace_index), case in zip(new_cases, loaded_cases):
+            # gather the stats of the loading, which may have run in another process
+            self.stats.merge(case.stats)
+            case.stats = self.stats
+            if replace_index is None:
+                self.cases[case.system].add_case(param_value, case, param_dict)
+            else:
+                self.cases[case.system].replace_case(replace_index, case)
+
+    def source_changed(self, source):
+        """
+        Whether a source directory is new or its ``.pmor.sharpy`` file, or the directory itself, has been modified
+        since it was loaded.
+        """
+        try:
+            signature = self.manifest[source]
+        except KeyError:
+            return True
+
+        try:
+            return source_signature(source, signature[0]) != signature
+        except OSError:
+            return True
+
+    def save_archive(self, path, compression='gzip'):
+        """
+        Packs every loaded case into a single compressed HDF5 archive. See :mod:`batch.archive`.
+
+        Only the data already loaded onto the cases is written.
+        """
+        batch.archive.save(self, path, compression=compression)
+
+    def load_archive(self, path):
+        """
+        Adds the cases of an archive written by :meth:`save_archive` to the sets.
+        """
+        n_cases = self.aeroelastic.n_cases
+        batch.archive.load(self, path)
+        logger.info('Loaded {} cases'.format(self.aeroelastic.n_cases - n_cases))
+
+    def eigs(self, sys, n_modes=None, **bounds):
+        """
+        Eigenvalues of every case of a system together with the parameters of their case.
+
+        Args:
+            sys (str): System name.
+            n_modes (int (optional)): Keep only the first ``n_modes`` eigenvalues of each case.
+            **bounds: ``wdmin``/``wdmax`` frequency limits and parameter bounds of the cases to include, see
+                :meth:`batch.eigenvalues.EigenvalueStack.root_locus`.
+
+        Returns:
+            tuple: Parameter array of shape ``n x n_parameters`` and eigenvalue array of shape ``n x 2``.
+        """
+        param_array, eigs = self.cases[sys].eigenvalues.root_locus(n_modes=n_modes, **bounds)
 
-        n_loaded_cases = 0
-        for source in source_cases_name:
+        if len(eigs) == 0:
+            raise FileNotFoundError('No eigenvalue data was found.')
+        return param_array, eigs
+
+    def compute_bode(self, sys, wv, method='eig', workers=None):
+        """
+        Computes the frequency response of every case of a system from its state-space, optionally on a process
+        pool. See :func:`linear.statespace.bulk_freqresp`.
+
+        Cases without a state-space are skipped.
+        """
+        cases = [case for case in self.cases[sys] if case.ss is not None]
+        bodes = bulk_freqresp([case.ss for case in cases], wv, method=method, workers=workers)
+        for case, bode in zip(cases, bodes):
+            case.bode = bode
+
+    def wing_tip_deflection(self, frame='a', alpha=0, reference_line=np.array([0, 0, 0], dtype=float), sort_by=None):
+        """
+        Tip deflection of every aeroelastic case, see :meth:`batch.results.ResultsTable.wing_tip_deflection`.
+
+        Args:
+            sort_by (list (optional)): Parameters by which the cases are sorted lexicographically. All parameters by
+                default.
+
+        Returns:
+            tuple: Sorted parameter array of shape ``n_cases x n_parameters`` and deflection of shape
+            ``n_cases x 3``, as read-only views of the cached results.
+        """
+        results = self.aeroelastic.results(sort_by)
+        return results.parameters, results.wing_tip_deflection(frame=frame, alpha=alpha,
+                                                               reference_line=reference_line)
+
+    def forces(self, frame='g', sort_by=None):
+        """
+        Aerodynamic forces of every aeroelastic case in the ``'g'`` or ``'a'`` frame.
+
+        Returns:
+            tuple: Sorted parameter array and forces of shape ``n_cases x 3``, as read-only views of the cached
+            results. See :meth:`wing_tip_deflection`.
+        """
+        results = self.aeroelastic.results(sort_by)
+        return results.parameters, results.forces(frame)
+
+    def moments(self, frame='g', sort_by=None):
+        """
+        Aerodynamic moments of every aeroelastic case in the ``'g'`` or ``'a'`` frame.
+
+        The moments are read from the ``'AeroMoments'`` path of each case, which has no default, and are ``np.nan``
+        for cases where it is not set.
+
+        Returns:
+            tuple: Sorted parameter array and moments of shape ``n_cases x 3``, as read-only views of the cached
+            results. See :meth:`wing_tip_deflection`.
+        """
+        results = self.aeroelastic.results(sort_by)
+        return results.parameters, results.moments(frame)
+
+    def stability_set(self):
+        """
+        Velocity sweeps of every aeroelastic case stacked in a single :class:`linear.stability.StabilitySet`.
+
+        Cases without a loaded ``stability`` attribute are read from their ``stability/velocity*.dat`` file. The
+        parameters of the cases are written with the results by :meth:`linear.stability.StabilitySet.save_to_file`.
+        """
+        sources = []
+        for case in self.aeroelastic:
             try:
-                param_file = glob.glob(source + '/*.pmor.sharpy')[0]
-            except IndexError:
-                print('Unable to find source case .pmor.sharpy at {:s}'.format(source))
-                continue
+                sources.append(case.stability)
+            except AttributeError:
+                sources.append(case.path + '/stability/')
+        return StabilitySet(sources, self.aeroelastic.parameters.names, self.aeroelastic.parameters.values)
+
+    def flutter_speeds(self, instability_damping=0., vel_vmin=0., **kwargs):
+        """
+        First flutter speed of every aeroelastic case, computed for all cases in a single vectorised pass. See
+        :meth:`stability_set`.
+
+        Args:
+            instability_damping (float): Damping at the stability boundary.
+            vel_vmin (float): Velocities below this one are ignored.
+            **kwargs: Filtering settings passed to :func:`linear.stability.modes`.
+
+        Returns:
+            tuple: Parameter array of shape ``n_cases x n_parameters`` and flutter speed of each case (``np.nan``
+            where no flutter is found).
+        """
+        stability_set = self.stability_set()
+        stability_set.process(instability_damping=instability_damping, vel_vmin=vel_vmin, **kwargs)
+
+        return self.aeroelastic.parameters.values.copy(), stability_set.flutter_speed
+
+
+class CaseExecutor:
+    """
+    Maps the reading of cases onto a pool of workers.
+
+    Results are always returned in the order of the inputs, such that cases can be merged deterministically.
+
+    Args:
+        workers (int (optional)): Number of workers. If ``None`` (or ``1``) the cases are read serially.
+        executor (str or concurrent.futures.Executor): ``'thread'``, ``'process'`` or an existing executor. An
+            existing executor is not shut down on exit.
+    """
+    def __init__(self, workers=None, executor='thread'):
+        self._owned = False
+        if isinstance(executor, concurrent.futures.Executor):
+            self.executor = executor
+        elif workers is None or workers <= 1:
+            self.executor = None
+        elif executor == 'thread':
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            self._owned = True
+        elif executor == 'process':
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            self._owned = True
+        else:
+            raise NameError('Executor can only be thread or process')
 
-            case_info = configobj.ConfigObj(param_file)
+    def map(self, func, iterable):
+        if self.executor is None:
+            return [func(item) for item in iterable]
+        return list(self.executor.map(func, iterable))
 
-            self.param_name = []
-            param_value = []
-            for k, v in case_info['parameters'].items():
-                self.param_name.append(k)
-                param_value.append(v)
+    def __enter__(self):
+        return self
 
-            if replace_dir is not None:
-                path_to_source_case = case_info['sim_info']['path_to_data'].replace('/home/ng213/sharpy_cases/',
-                                                                                    '/home/ng213/2TB/')
-            else:
-                path_to_source_case = case_info['sim_info']['path_to_data']
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._owned:
+            self.executor.shutdown()
 
-            for sys in self.systems:
-                if param_value in self.cases[sys].parameter_values and append:
-                    continue
 
-                case = Case(case_info['parameters'].values(), sys, parameter_name=self.param_name,
-                            path_to_data=path_to_source_case, case_info=case_info['parameters'])
-                case.name = case_info['sim_info']['case']
+def read_source_header(source, stats=NULL_STATS):
+    """
+    Reads the ``[parameters]`` and ``[sim_info]`` sections of the ``.pmor.sharpy`` file of a source case, see
+    :func:`batch.headers.read_header`.
 
-                if eigs_legacy: # asymtotic stability in dev_pmor has an extra setting to save aeroelastic_eigenvalues.dat
-                    case.path_to_sys['eigs'] = case.path + '/stability/eigenvalues.dat'
-                else:
-                    case.path_to_sys['eigs'] = case.path + '/stability/{:s}_eigenvalues.dat'.format(sys)
-
-                case.path_to_sys['freqresp'] = case.path + '/frequencyresponse/{:s}.freqresp.h5'.format(sys)
-                case.path_to_sys['ss'] = case.path + '/statespace/{:s}.statespace.dat'.format(sys)
-                try:
-                    case.alpha = float(list(case_info['parameters'].items())[1][1])
-                except IndexError:
-                    pass
-                if 'eigs' in args:
-                    case.load_eigs()
-                if 'bode' in args:
-                    case.load_bode()
-                case.path_to_sys['WriteVariablesTime'] = case.path + '/WriteVariablesTime/*'
-
-                if 'deflection' in args:
-                    case.load_deflection()
-
-                if sys == 'aeroelastic' and 'stability' in args:
-                    case.stability = Stability(case.path + '/stability/')
-
-                case.path_to_sys['beam_modal_analysis'] = case.path + '/beam_modal_analysis'
-                if 'beam_modal_analysis' in args:
-                    case.load_beam_modal_analysis()
-
-                if 'forces' in args:
-                    case.load_forces(case.path + '/forces/aeroforces.txt')
-
-                if 'ss' in args:
-                    case.load_ss(path=case.path)
-                self.cases[sys].add_case(param_value, case, case_info['parameters'])
-            n_loaded_cases += 1
-        print('Loaded {} cases'.format(n_loaded_cases))
-        if n_loaded_cases == 0:
-            print(source_cases_name)
-
-    def eigs(self, sys):
-        param_array = []
-        eigs = []
-        for case in self.cases[sys]:
-            try:
-                param_array.append(np.ones((case.eigs.shape[0], len(case.parameter_value))) * case.parameter_value)
-                eigs.append(case.eigs)
-            except TypeError:
-                param_array.append(np.ones_like(case.eigs[:, 0]) * case.parameter_value)
-            except AttributeError:
-                continue
+    Args:
+        source (str): Path to the source case directory.
+        stats (individual.instrumentation.LoadStats (optional)): Stats of the ``glob`` and ``parse`` stages.
 
-        if len(eigs) == 0:
-            raise FileNotFoundError('No eigenvalue data was found.')
-        return np.concatenate(param_array), np.concatenate(eigs)
+    Returns:
+        batch.headers.Header: Case information. ``None`` if the file cannot be found.
+    """
+    with stats.stage('glob'):
+        param_files = glob.glob(source + '/*.pmor.sharpy')
+    if len(param_files) == 0:
+        logger.warning('Unable to find source case .pmor.sharpy at {:s}'.format(source))
+        stats.failure('parse', source, 'no .pmor.sharpy file')
+        return None
 
-    def wing_tip_deflection(self, frame='a', alpha=0, reference_line=np.array([0, 0, 0], dtype=float)):
-        param_array = []
-        deflection = []
+    with stats.stage('parse'):
+        case_info = read_header(param_files[0], SOURCE_SECTIONS)
+    stats.add_io('parse', param_files[:1])
+    return case_info
 
-        if frame == 'g':
-            try:
-                import sharpy.utils.algebra as algebra
-            except ModuleNotFoundError:
-                raise(ModuleNotFoundError('Please load sharpy'))
-            else:
-                cga = algebra.quat2rotation(algebra.euler2quat(np.array([0, alpha * np.pi / 180, 0])))
-
-        for case in self.cases['aeroelastic']:
-            param_array.append(case.parameter_value)
-            if frame == 'a':
-                deflection.append(case.get_deflection_at_line(reference_line)[-1, -3:])
-            elif frame == 'g':
-                deflection.append(cga.dot(case.get_deflection_at_line(reference_line)[-1, -3:]))
-
-        param_array = np.array(param_array)
-        order = np.argsort(param_array)
-        param_array = param_array[order]
-        deflection = np.array([deflection[ith] for ith in order])
-
-        return param_array, deflection
-
-    def forces(self, frame='g'):
-        param_array = []
-        forces = []
-        for case in self.cases['aeroelastic']:
-            param_array.append(case.parameter_value)
-            if frame == 'g':
-                forces.append(case.aero_forces[1:4])
-            elif frame == 'a':
-                forces.append(case.aero_forces[7:10])
-            else:
-                raise NameError('Frame can only be A or G')
-
-        param_array = np.array(param_array)
-        order = np.argsort(param_array)
-        param_array = param_array[order]
-        forces = np.vstack(([forces[ith] for ith in order]))
-
-        return param_array, forces
-
-    def moments(self, frame='g'):
-        param_array = []
-        moments = []
-        for case in self.cases['aeroelastic']:
-            param_array.append(case.parameter_value)
-            if frame == 'g':
-                moments.append(case.aero_moments[1:4])
-            elif frame == 'a':
-                moments.append(case.aero_moments[7:10])
-            else:
-                raise NameError('Frame can only be A or G')
 
-        param_array = np.array(param_array)
-        order = np.argsort(param_array)
-        param_array = param_array[order]
-        moments = np.vstack(([moments[ith] for ith in order]))
+def read_source_header_stats(source):
+    """
+    As :func:`read_source_header`, also returning the stats of the reading such that they can be gathered from
+    worker processes.
+    """
+    stats = LoadStats()
+    return read_source_header(source, stats), stats
+
+
+def source_signature(source, param_file):
+    """
+    Signature of a source case given by the path, modification time and size of its ``.pmor.sharpy`` file and the
+    modification time of its directory.
+
+    Raises:
+        OSError: if the file or directory do not exist.
+    """
+    param_stat = os.stat(param_file)
+    return param_file, param_stat.st_mtime_ns, param_stat.st_size, os.stat(source).st_mtime_ns
 
-        return param_array, moments
+
+def load_case_data(case, args=()):
+    """
+    Loads the data requested in ``args`` onto the case.
+
+    Args:
+        case (individual.case.Case): Case with its ``path_to_sys`` populated.
+        args (tuple): Data to load, as in :meth:`Actual.load_bulk_cases`.
+
+    Returns:
+        individual.case.Case: The loaded case (a copy when run on a process pool). If instrumentation is enabled,
+        its ``stats`` only hold those of this loading, to be merged by the caller.
+    """
+    if case.stats.enabled:
+        case.stats = LoadStats()
+
+    if 'eigs' in args:
+        case.load_eigs()
+    if 'bode' in args:
+        case.load_bode()
+
+    if 'deflection' in args:
+        case.load_deflection()
+
+    if case.system == 'aeroelastic' and 'stability' in args:
+        with case.stats.stage('stability'):
+            case.stability = Stability(case.path + '/stability/', stats=case.stats)
+
+    if 'beam_modal_analysis' in args:
+        case.load_beam_modal_analysis()
+
+    if 'forces' in args:
+        case.load_forces()
+
+    if 'ss' in args:
+        case.load_ss()
+
+    return case
+
+
+def apply_to_case(case, args=(), func=None):
+    """
+    Loads the data requested in ``args`` onto the case and applies ``func`` to it.
+
+    Returns:
+        tuple: ``func(case)`` (or the case itself if ``func`` is ``None``) and the stats of the loading.
+    """
+    case = load_case_data(case, args)
+    stats = case.stats
+    case.stats = NULL_STATS
+    if func is None:
+        return case, stats
+    return func(case), stats
 
 
 class SetIterator:
@@ -196,22 +613,97 @@ class SetIterator:
 class SetOfCases:
     def __init__(self):
         self.cases = list()
-        self.parameter_values = list()
         self.id_list = dict()
 
-        self.database = dict()
+        self.parameters = ParameterTable()  #: columnar table of the case parameters, one row per case
+        self._eigenvalues = None
+        self._results = dict()
 
         self._n_cases = 0
 
     def add_case(self, parameter_value, case, param_dict=None):
         case.case_id = self.n_cases + 1
 
+        if param_dict is None:
+            param_dict = dict(zip(case.parameter_name, np.atleast_1d(case.parameter_value)))
+        row = self.parameters.append({k: float(v) for k, v in param_dict.items()})
+        case.attach(self.parameters, row)
+
         self.cases.append(case)
-        self.parameter_values.append(parameter_value)
         self.id_list[case.case_id] = case
-        if param_dict is None:
-            import pdb; pdb.set_trace()
-        self.database[case.case_id] = {k: float(v) for k, v in param_dict.items()}
+        self._eigenvalues = None
+        self._results = dict()
+
+    @property
+    def parameter_values(self):
+        """np.ndarray: Parameters of the cases, one row per case. See :attr:`parameters`."""
+        return self.parameters.values
+
+    @property
+    def database(self):
+        """dict: ``case_id`` to the ``name: value`` parameters of the case, built from :attr:`parameters`."""
+        return {case.case_id: dict(zip(self.parameters.names, row))
+                for case, row in zip(self.cases, self.parameters.values.tolist())}
+
+    @property
+    def eigenvalues(self):
+        """
+        batch.eigenvalues.EigenvalueStack: Stacked eigenvalues of all cases.
+
+        Built on first access and rebuilt when cases are added. Call :meth:`refresh_eigenvalues` if the eigenvalues
+        of existing cases are reloaded.
+        """
+        if self._eigenvalues is None:
+            self._eigenvalues = EigenvalueStack(self)
+        return self._eigenvalues
+
+    def refresh_eigenvalues(self):
+        self._eigenvalues = None
+
+    def results(self, sort_by=None):
+        """
+        Results of the cases in sorted arrays, see :class:`batch.results.ResultsTable`.
+
+        The table is built on first access and rebuilt when cases are added or replaced. Call
+        :meth:`refresh_results` if the data of existing cases is reloaded.
+
+        Args:
+            sort_by (list (optional)): Parameters by which the cases are sorted lexicographically. All parameters by
+                default.
+
+        Returns:
+            batch.results.ResultsTable: Cached results.
+        """
+        key = tuple(sort_by) if sort_by is not None else None
+        if key not in self._results:
+            self._results[key] = ResultsTable(self, sort_by=sort_by)
+        return self._results[key]
+
+    def refresh_results(self):
+        self._results = dict()
+
+    def track_modes(self, parameter=None, **kwargs):
+        """
+        Tracks the eigenvalues of the cases along ``parameter``. See :class:`batch.tracking.ModeTracker`.
+
+        Returns:
+            batch.tracking.ModeTracker: Tracker with its branches computed.
+        """
+        tracker = ModeTracker(self, parameter=parameter, **kwargs)
+        tracker.track()
+        return tracker
+
+    def replace_case(self, index, case):
+        """
+        Replaces the case at position ``index`` with a reloaded case with the same parameters, which keeps the
+        ``case_id`` of the original.
+        """
+        case.case_id = self.cases[index].case_id
+        case.attach(self.parameters, index)
+        self.cases[index] = case
+        self.id_list[case.case_id] = case
+        self._eigenvalues = None
+        self._results = dict()
 
     def __call__(self, i):
         return self.cases[i]
@@ -229,19 +721,52 @@ class SetOfCases:
         return SetIterator(self)
 
     def find_parameter_value(self, param_value, return_idx=False):
-        ind = self.parameter_values.index(param_value)
+        """
+        Finds the case with the given parameter values, in the order of the parameter columns.
+
+        Raises:
+            ValueError: if there is no case with such parameters.
+        """
+        try:
+            ind = self.parameters.find(param_value)
+        except KeyError:
+            raise ValueError('No case with parameters {}'.format(param_value))
         if not return_idx:
             return self(ind)
         else:
             return ind
 
     def find_param(self, param_value, return_idx=False):
-        for case_id, entry_values in self.database.items():
-            if entry_values == param_value:
-                if not return_idx:
-                    try:
-                        return self.id_list[case_id]
-                    except KeyError:
-                        msg = f'Unable to find case with {case_id}'
-                else:
-                    return case_id
+        """
+        Finds the case with the given ``name: value`` parameter dictionary.
+
+        Returns:
+            individual.case.Case: The case, or its ``case_id`` if ``return_idx``. ``None`` if not found.
+        """
+        try:
+            ind = self.parameters.find({k: float(v) for k, v in param_value.items()})
+        except (KeyError, ValueError):
+            return None
+        if not return_idx:
+            return self(ind)
+        else:
+            return self(ind).case_id
+
+    def select(self, **bounds):
+        """
+        Cases with parameters within the given bounds.
+
+        Args:
+            **bounds: ``name=(min, max)`` inclusive bounds or ``name=value``, see :meth:`ParameterTable.range`.
+
+        Returns:
+            list: Cases, in the order they were added.
+        """
+        return [self(ind) for ind in self.parameters.range(**bounds)]
+
+    def nearest(self, k=1, scale=None, **values):
+        """
+        The ``k`` cases nearest to the given ``name=value`` parameters, nearest first. See
+        :meth:`ParameterTable.nearest`.
+        """
+        return [self(ind) for ind in self.parameters.nearest(k=k, scale=scale, **values)]
@@ -0,0 +1,212 @@
+"""
+Tracking of eigenvalues across a parameter sweep.
+
+The eigenvalues of each case are stored in arbitrary order. Here they are matched between neighbouring parameter
+points by solving an assignment problem on the distance between eigenvalues (optionally combined with the modal
+assurance criterion of the eigenvectors) so that they form continuous branches.
+
+To scale to large numbers of modes, each eigenvalue is only linked to its ``n_neighbours`` nearest candidates, found
+with a k-d tree, and the resulting sparse assignment problem is solved with
+``scipy.sparse.csgraph.min_weight_full_bipartite_matching``. The dense Hungarian solver is used as a fallback when
+the sparse problem has no full matching.
+"""
+import numpy as np
+from linear.stability import find_flutter_speed_groups
+
+
+class ModeTracker:
+    """
+    Eigenvalue branches along a one-dimensional parameter sweep.
+
+    Args:
+        set_of_cases (batch.sets.SetOfCases): Cases of the sweep.
+        parameter (str (optional)): Name of the swept parameter. Defaults to the first parameter.
+        n_neighbours (int): Number of candidate matches considered for each eigenvalue.
+        max_distance (float): Eigenvalues further apart than this are not matched and start a new branch.
+        use_eigenvectors (bool): Compute the eigenvalues and eigenvectors from the state-space ``A`` matrix of each
+            case and include the modal assurance criterion in the matching cost.
+        mac_weight (float): Weight of ``1 - MAC`` relative to the eigenvalue distance.
+        **bounds: Parameter bounds selecting the cases of the sweep (i.e. fixing the other parameters), see
+            :meth:`batch.parameters.ParameterTable.range`.
+
+    Attributes:
+        rows (np.ndarray): Row in the set of each step of the sweep, sorted by the swept parameter.
+        parameter_values (np.ndarray): Value of the swept parameter at each step.
+        branches (np.ndarray): Tracked eigenvalues of shape ``n_steps x n_branches x 2``, ``np.nan`` where a branch
+            does not exist.
+    """
+    def __init__(self, set_of_cases, parameter=None, n_neighbours=8, max_distance=np.inf, use_eigenvectors=False,
+                 mac_weight=1., **bounds):
+        self.set_of_cases = set_of_cases
+        if parameter is None:
+            parameter = set_of_cases.parameters.names[0]
+        self.parameter = parameter
+
+        self.n_neighbours = n_neighbours
+        self.max_distance = max_distance
+        self.use_eigenvectors = use_eigenvectors
+        self.mac_weight = mac_weight
+
+        rows = set_of_cases.parameters.range(**bounds)
+        values = set_of_cases.parameters.column(parameter)[rows]
+        order = np.argsort(values, kind='stable')
+        self.rows = rows[order]
+        self.parameter_values = values[order]
+
+        self.branches = None
+
+    def track(self):
+        """
+        Matches the eigenvalues of consecutive steps and builds :attr:`branches`.
+
+        Returns:
+            np.ndarray: :attr:`branches`
+        """
+        step_eigs = []
+        step_branch = []
+        n_branches = 0
+
+        previous = None
+        previous_vectors = None
+        previous_branch = None
+        for row in self.rows:
+            eigs, vectors = self._case_modes(self.set_of_cases(row))
+            branch = np.full(len(eigs), -1, dtype=int)
+
+            if previous is not None and len(previous) > 0 and len(eigs) > 0:
+                i_previous, i_current = match_eigenvalues(previous, eigs, n_neighbours=self.n_neighbours,
+                                                          max_distance=self.max_distance,
+                                                          previous_vectors=previous_vectors,
+                                                          current_vectors=vectors, mac_weight=self.mac_weight)
+                branch[i_current] = previous_branch[i_previous]
+
+            new_branch = branch == -1
+            branch[new_branch] = n_branches + np.arange(np.count_nonzero(new_branch))
+            n_branches += np.count_nonzero(new_branch)
+
+            step_eigs.append(eigs)
+            step_branch.append(branch)
+            previous, previous_vectors, previous_branch = eigs, vectors, branch
+
+        self.branches = np.full((len(self.rows), n_branches, 2), np.nan)
+        for i_step, (eigs, branch) in enumerate(zip(step_eigs, step_branch)):
+            self.branches[i_step, branch] = eigs
+
+        return self.branches
+
+    def branch(self, i_branch):
+        """
+        Parameter values and eigenvalues of a single branch where it exists.
+        """
+        valid = ~np.isnan(self.branches[:, i_branch, 0])
+        return self.parameter_values[valid], self.branches[valid, i_branch]
+
+    def damping(self):
+        """
+        Damping ratio of each branch at each step, of shape ``n_steps x n_branches``.
+        """
+        return self.branches[:, :, 0] / np.abs(self.branches[:, :, 0] + 1j * self.branches[:, :, 1])
+
+    def velocity_damping(self):
+        """
+        Flat arrays of swept parameter, damping and branch number of every tracked eigenvalue, in the format
+        consumed by :func:`linear.stability.find_flutter_speed` (and its ``groups`` variant).
+        """
+        damp = self.damping()
+        step, branch = np.nonzero(~np.isnan(damp))
+        return self.parameter_values[step], damp[step, branch], branch
+
+    def flutter_speeds(self, instability_damping=0., vel_vmin=0.):
+        """
+        Crossings of the stability boundary of each branch.
+
+        Returns:
+            tuple: Branch and parameter value of every crossing.
+        """
+        v, damp, branch = self.velocity_damping()
+        return find_flutter_speed_groups(v, damp, branch, instability_damping=instability_damping,
+                                         vel_vmin=vel_vmin)
+
+    def _case_modes(self, case):
+        if not self.use_eigenvectors:
+            eigs = case.eigs
+            if eigs is None:
+                return np.zeros((0, 2)), None
+            return np.atleast_2d(eigs), None
+
+        a = case.ss.A
+        try:
+            a = a.toarray()
+        except AttributeError:
+            pass
+        eigenvalues, eigenvectors = np.linalg.eig(a)
+        if case.ss.dt is not None:
+            eigenvalues = np.log(eigenvalues) / case.ss.dt  # continuous time equivalent
+        return np.column_stack((eigenvalues.real, eigenvalues.imag)), eigenvectors
+
+
+def match_eigenvalues(previous, current, n_neighbours=8, max_distance=np.inf, previous_vectors=None,
+                      current_vectors=None, mac_weight=1.):
+    """
+    Matches two sets of eigenvalues minimising the total distance between matched pairs.
+
+    Args:
+        previous (np.ndarray): Eigenvalues of shape ``n_p x 2`` (real and imaginary parts).
+        current (np.ndarray): Eigenvalues of shape ``n_c x 2``.
+        n_neighbours (int): Number of nearest candidates considered for each current eigenvalue.
+        max_distance (float): Pairs further apart than this are not matched.
+        previous_vectors (np.ndarray (optional)): Eigenvectors of the previous set, one per column.
+        current_vectors (np.ndarray (optional)): Eigenvectors of the current set, one per column.
+        mac_weight (float): Weight of ``1 - MAC`` in the matching cost when eigenvectors are given.
+
+    Returns:
+        tuple: Indices of the matched eigenvalues in ``previous`` and in ``current``.
+    """
+    try:
+        from scipy.spatial import cKDTree
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+        from scipy.optimize import linear_sum_assignment
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError('Mode tracking requires scipy')
+
+    n_previous = previous.shape[0]
+    n_current = current.shape[0]
+    k = min(n_neighbours, n_previous)
+
+    distance, i_previous = cKDTree(previous).query(current, k=k, distance_upper_bound=max_distance)
+    distance = distance.reshape(n_current, k)
+    i_previous = i_previous.reshape(n_current, k)
+    i_current = np.repeat(np.arange(n_current), k).reshape(n_current, k)
+
+    linked = np.isfinite(distance)
+    i_previous = i_previous[linked]
+    i_current = i_current[linked]
+    cost = distance[linked]
+
+    if previous_vectors is not None and current_vectors is not None:
+        cost = cost + mac_weight * (1 - mac(previous_vectors[:, i_previous], current_vectors[:, i_current]))
+
+    # offset such that zero cost links are kept as explicit entries of the sparse graph
+    biadjacency = csr_matrix((cost + 1e-12, (i_previous, i_current)), shape=(n_previous, n_current))
+    try:
+        pairs = np.column_stack(min_weight_full_bipartite_matching(biadjacency))
+    except ValueError:
+        # no full matching within the nearest neighbours, solve the dense problem instead
+        dense_cost = np.full((n_previous, n_current), 1e12)
+        dense_cost[i_previous, i_current] = cost
+        pairs = np.column_stack(linear_sum_assignment(dense_cost))
+        pairs = pairs[dense_cost[pairs[:, 0], pairs[:, 1]] < 1e12]
+
+    return pairs[:, 0], pairs[:, 1]
+
+
+def mac(vectors_a, vectors_b):
+    r"""
+    Modal assurance criterion between pairs of vectors, column by column
+
+    .. math::
+        \mathrm{MAC}(\phi_a, \phi_b) = \frac{|\phi_a^H \phi_b|^2}{(\phi_a^H \phi_a)(\phi_b^H \phi_b)}
+    """
+    cross = np.abs(np.sum(np.conj(vectors_a) * vectors_b, axis=0)) ** 2
+    return cross / (np.sum(np.abs(vectors_a) ** 2, axis=0) * np.sum(np.abs(vectors_b) ** 2, axis=0))
@@ -0,0 +1,137 @@
+"""
+Benchmark suite of the loaders and analysis functions.
+
+Generates a synthetic sweep (see :mod:`benchmarks.synthetic`), times each benchmark and tracks its peak memory
+allocation, and writes the results as JSON such that regressions can be tracked::
+
+    python -m benchmarks.run --cases 200 --nodes 50 --output benchmark.json
+
+It runs fully offline.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from batch.sets import Actual
+from linear.statespace import Statistics
+import benchmarks.synthetic as synthetic
+
+
+def measure(func, repeats=3):
+    """
+    Times ``func`` and records its peak memory allocation.
+
+    Args:
+        func (callable): Function to benchmark, without arguments.
+        repeats (int): Number of timed runs.
+
+    Returns:
+        dict: Best and all run times in seconds and peak traced memory in bytes.
+    """
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+
+    # memory is traced in a separate run as tracemalloc slows down the execution
+    tracemalloc.start()
+    func()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'time': min(times), 'times': times, 'peak_memory': peak_memory}
+
+
+def load_actual(path, *args, **kwargs):
+    actual = Actual(path)
+    actual.load_bulk_cases(*args, **kwargs)
+    return actual
+
+
+def run(path, repeats=3, workers=4, n_outputs=4, n_inputs=2, n_freq=100):
+    """
+    Runs the benchmarks on the sweep at ``path``.
+
+    Returns:
+        dict: Results of each benchmark by name.
+    """
+    results = dict()
+
+    results['load_bulk_cases_index'] = measure(lambda: load_actual(path), repeats)
+    results['load_bulk_cases_serial'] = measure(lambda: load_actual(path, 'eigs', 'bode', 'deflection', 'forces'),
+                                                repeats)
+    results['load_bulk_cases_threads'] = measure(lambda: load_actual(path, 'eigs', 'bode', 'deflection', 'forces',
+                                                                     workers=workers), repeats)
+
+    actual = load_actual(path, 'eigs', 'deflection', 'forces', 'stability')
+
+    def eigs():
+        actual.aeroelastic.refresh_eigenvalues()
+        actual.eigs('aeroelastic')
+    results['eigs'] = measure(eigs, repeats)
+
+    def wing_tip_deflection():
+        actual.aeroelastic.refresh_results()
+        actual.wing_tip_deflection(reference_line=np.array([0, 1., 0]))
+    results['wing_tip_deflection'] = measure(wing_tip_deflection, repeats)
+    results['find_flutter_speed'] = measure(lambda: actual.flutter_speeds(), repeats)
+
+    rng = np.random.default_rng(0)
+    omega = np.linspace(0.1, 100, n_freq)
+    input_psd = 1 / (1 + omega ** 2)
+    frf = rng.normal(size=(actual.aeroelastic.n_cases, n_outputs, n_inputs, n_freq)) \
+        + 1j * rng.normal(size=(actual.aeroelastic.n_cases, n_outputs, n_inputs, n_freq))
+    results['psd_covariance'] = measure(lambda: Statistics(input_psd, frf, omega).run(), repeats)
+    results['psd_covariance_chunked'] = measure(lambda: Statistics(input_psd, frf, omega, chunk_size=16).run(),
+                                                repeats)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the SHARPy analysis tools')
+    parser.add_argument('--cases', type=int, default=100, help='Number of cases')
+    parser.add_argument('--nodes', type=int, default=20, help='Number of beam nodes')
+    parser.add_argument('--eigs', type=int, default=50, help='Number of eigenvalues per case')
+    parser.add_argument('--outputs', type=int, default=4, help='Number of FRF outputs')
+    parser.add_argument('--inputs', type=int, default=2, help='Number of FRF inputs')
+    parser.add_argument('--freq', type=int, default=100, help='Number of FRF frequencies')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of timed runs of each benchmark')
+    parser.add_argument('--workers', type=int, default=4, help='Number of workers of the parallel loader')
+    parser.add_argument('--path', default=None, help='Directory of the synthetic sweep (temporary by default)')
+    parser.add_argument('--output', default=None, help='Path to the JSON results (stdout by default)')
+    args = parser.parse_args(argv)
+
+    config = {'cases': args.cases, 'nodes': args.nodes, 'eigs': args.eigs, 'outputs': args.outputs,
+              'inputs': args.inputs, 'freq': args.freq, 'repeats': args.repeats, 'workers': args.workers}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.path if args.path is not None else tmp_dir
+        path = synthetic.generate_tree(root, n_cases=args.cases, n_nodes=args.nodes, n_eigs=args.eigs,
+                                       n_outputs=args.outputs, n_inputs=args.inputs, n_freq=args.freq)
+        # keep the loaders' messages out of the results
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(path, repeats=args.repeats, workers=args.workers, n_outputs=args.outputs,
+                          n_inputs=args.inputs, n_freq=args.freq)
+
+    output = {'environment': {'python': platform.python_version(),
+                              'numpy': np.__version__,
+                              'platform': platform.platform()},
+              'config': config,
+              'results': results}
+
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Synthetic SHARPy case generator.
+
+Writes a tree of parametric cases with the directory layout read by :meth:`batch.sets.Actual.load_bulk_cases`::
+
+    <root>/case00000/case00000.pmor.sharpy
+                    /stability/eigenvalues.dat
+                    /stability/velocity_analysis.dat
+                    /frequencyresponse/<system>.freqresp.h5
+                    /statespace/<system>.statespace.dat
+                    /WriteVariablesTime/case00000_struct_pos_node<n>.dat
+                    /WriteVariablesTime/case00000_struct_psi_node<n>.dat
+                    /forces/aeroforces.txt
+
+The data is random but shaped like the real outputs, which is all that is needed to measure the loaders and the
+analysis functions.
+"""
+import os
+import h5py as h5
+import numpy as np
+
+SYSTEMS = ['aeroelastic', 'aerodynamic', 'structural']
+
+
+def generate_tree(root, n_cases=100, n_nodes=20, n_eigs=50, n_outputs=4, n_inputs=2, n_freq=100, n_velocities=20,
+                  n_time_steps=5, n_states=10, seed=0):
+    """
+    Generates a synthetic sweep of cases over ``u_inf`` and ``alpha``.
+
+    Args:
+        root (str): Directory in which to write the cases.
+        n_cases (int): Number of cases.
+        n_nodes (int): Number of beam nodes written by ``WriteVariablesTime``.
+        n_eigs (int): Number of eigenvalues of each case.
+        n_outputs (int): Number of outputs of the frequency response.
+        n_inputs (int): Number of inputs of the frequency response.
+        n_freq (int): Number of frequencies of the frequency response.
+        n_velocities (int): Number of velocities of the stability sweep.
+        n_time_steps (int): Number of time steps in each node file.
+        n_states (int): Number of states of the state-space.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        str: Glob pattern of the case directories, to be given to :class:`batch.sets.Actual`.
+    """
+    rng = np.random.default_rng(seed)
+    n_alpha = 4
+    for i_case in range(n_cases):
+        name = 'case{:05d}'.format(i_case)
+        u_inf = 10. + i_case // n_alpha
+        alpha = float(i_case % n_alpha)
+        write_case(os.path.join(root, name), name, {'u_inf': u_inf, 'alpha': alpha}, rng, n_nodes=n_nodes,
+                   n_eigs=n_eigs, n_outputs=n_outputs, n_inputs=n_inputs, n_freq=n_freq, n_velocities=n_velocities,
+                   n_time_steps=n_time_steps, n_states=n_states)
+
+    return os.path.join(root, 'case*')
+
+
+def write_case(path, name, parameters, rng, n_nodes=20, n_eigs=50, n_outputs=4, n_inputs=2, n_freq=100,
+               n_velocities=20, n_time_steps=5, n_states=10):
+    """
+    Writes a single synthetic case. See :func:`generate_tree`.
+    """
+    for directory in ['stability', 'frequencyresponse', 'statespace', 'WriteVariablesTime', 'forces']:
+        os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+    with open(os.path.join(path, name + '.pmor.sharpy'), 'w') as f:
+        f.write('[parameters]\n')
+        for k, v in parameters.items():
+            f.write('{:s} = {:f}\n'.format(k, v))
+        f.write('[sim_info]\n')
+        f.write('path_to_data = {:s}\n'.format(path))
+        f.write('case = {:s}\n'.format(name))
+
+    eigs = np.column_stack((-np.abs(rng.normal(size=n_eigs)), np.abs(rng.normal(size=n_eigs)) * 50))
+    np.savetxt(os.path.join(path, 'stability', 'eigenvalues.dat'), eigs)
+
+    velocities = np.linspace(10, 100, n_velocities)
+    n_modes = 5
+    damping = -0.05 + 0.1 * (velocities[:, None] / 100) * rng.uniform(0.5, 1.5, size=n_modes)
+    frequency = rng.uniform(1, 50, size=n_modes)[None, :] * np.ones((n_velocities, 1))
+    velocity_eigs = np.column_stack((np.repeat(velocities, n_modes), (damping * frequency).ravel(),
+                                     frequency.ravel()))
+    np.savetxt(os.path.join(path, 'stability', 'velocity_analysis.dat'), velocity_eigs)
+
+    wv = np.logspace(-1, 2, n_freq)
+    for sys in SYSTEMS:
+        with h5.File(os.path.join(path, 'frequencyresponse', '{:s}.freqresp.h5'.format(sys)), 'w') as f:
+            f['frequency'] = wv
+            f['response'] = rng.normal(size=(n_outputs, n_inputs, n_freq)) \
+                + 1j * rng.normal(size=(n_outputs, n_inputs, n_freq))
+
+        with h5.File(os.path.join(path, 'statespace', '{:s}.statespace.dat'.format(sys)), 'w') as f:
+            f['a'] = rng.normal(size=(n_states, n_states)) - 2 * n_states * np.eye(n_states)
+            f['b'] = rng.normal(size=(n_states, n_inputs))
+            f['c'] = rng.normal(size=(n_outputs, n_states))
+            f['d'] = np.zeros((n_outputs, n_inputs))
+
+    time_steps = np.arange(n_time_steps)[:, None]
+    for i_node in range(n_nodes):
+        span = float(i_node)
+        pos = np.column_stack((time_steps, np.zeros((n_time_steps, 1)) + 0.01 * span,
+                               np.zeros((n_time_steps, 1)) + span, 0.001 * span ** 2 * np.ones((n_time_steps, 1))))
+        psi = np.column_stack((time_steps, 1e-3 * span * rng.normal(size=(n_time_steps, 3))))
+        np.savetxt(os.path.join(path, 'WriteVariablesTime', '{:s}_struct_pos_node{:g}.dat'.format(name, i_node)), pos)
+        np.savetxt(os.path.join(path, 'WriteVariablesTime', '{:s}_struct_psi_node{:g}.dat'.format(name, i_node)), psi)
+
+    with open(os.path.join(path, 'forces', 'aeroforces.txt'), 'w') as f:
+        f.write('tstep, fx_g, fy_g, fz_g, fx_g_s, fy_g_s, fz_g_s, fx_a, fy_a, fz_a, fx_a_s, fy_a_s, fz_a_s\n')
+        f.write(', '.join('{:f}'.format(value) for value in np.concatenate(([0], rng.normal(size=12)))) + '\n')
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CaseCache:
+    """
+    Persistent on-disk store of parsed case data.
+
+    Each entry is a ``.npz`` file holding the arrays parsed from one or more source files, together with the
+    modification time and size of those files. An entry is only returned while all of its sources are unchanged.
+    Once the store exceeds ``max_size`` bytes the least recently used entries are evicted. Entries can be written
+    concurrently from several threads or processes.
+
+    Args:
+        path (str): Directory of the store. Created if it does not exist.
+        max_size (int): Maximum size of the store in bytes.
+    """
+    def __init__(self, path, max_size=2 * 1024 ** 3):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+        self._size = None  # size of the store, computed on the first write
+        self._lock = threading.Lock()  # guards _size and the eviction
+
+    def entry(self, kind, key):
+        """
+        Path to the entry holding data of type ``kind`` (i.e. ``eigs``, ``bode``...) read from ``key``.
+        """
+        digest = hashlib.sha1('{:s}:{:s}'.format(kind, os.path.abspath(key)).encode()).hexdigest()
+        return os.path.join(self.path, digest + '.npz')
+
+    @staticmethod
+    def signature(sources):
+        """
+        Signature of the source files given by their path, modification time and size.
+
+        Raises:
+            OSError: if any of the sources does not exist.
+        """
+        signature = []
+        for source in sorted(sources):
+            stat = os.stat(source)
+            signature.append('{:s}:{:d}:{:d}'.format(os.path.abspath(source), stat.st_mtime_ns, stat.st_size))
+        return '\n'.join(signature)
+
+    def get(self, kind, key, sources):
+        """
+        Returns the cached arrays if the entry exists and its sources are unchanged.
+
+        Args:
+            kind (str): Type of data.
+            key (str): Path identifying the data (file or glob pattern).
+            sources (list): Paths to the files from which the data was parsed.
+
+        Returns:
+            dict: Arrays stored in the entry. ``None`` if the entry is missing or stale.
+        """
+        entry = self.entry(kind, key)
+        try:
+            signature = self.signature(sources)
+            with np.load(entry) as data:
+                if str(data['__signature__']) != signature:
+                    return None
+                arrays = {name: data[name] for name in data.files if name != '__signature__'}
+            os.utime(entry)  # mark as recently used
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        return arrays
+
+    def put(self, kind, key, sources, **arrays):
+        """
+        Stores the arrays parsed from ``sources`` and evicts old entries if the store is over its size limit.
+
+        Args:
+            kind (str): Type of data.
+            key (str): Path identifying the data (file or glob pattern).
+            sources (list): Paths to the files from which the data was parsed.
+            **arrays: Arrays to store.
+
+        Returns:
+            bool: Whether the entry was written.
+        """
+        entry = self.entry(kind, key)
+        tmp_entry = None
+        try:
+            signature = self.signature(sources)
+            # unique temporary file, such that concurrent writers of the same entry do not clash
+            fd, tmp_entry = tempfile.mkstemp(dir=self.path, suffix='.tmp.npz')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, __signature__=np.array(signature), **arrays)
+            os.replace(tmp_entry, entry)
+            entry_size = os.path.getsize(entry)
+        except OSError:
+            logger.warning('Unable to write cache entry {:s}'.format(entry))
+            if tmp_entry is not None and os.path.exists(tmp_entry):
+                os.remove(tmp_entry)
+            return False
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += entry_size
+
+            if self._size > self.max_size:
+                self._evict(self.max_size)
+        return True
+
+    def size(self):
+        """Total size of the store in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_size=None):
+        """
+        Removes the least recently used entries until the store is below ``max_size`` bytes.
+        """
+        if max_size is None:
+            max_size = self.max_size
+
+        with self._lock:
+            self._evict(max_size)
+
+    def _evict(self, max_size):
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self._size <= max_size:
+                break
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            self._size -= size
+
+    def clear(self):
+        self.evict(max_size=0)
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.path) as it:
+            for item in it:
+                if not item.name.endswith('.npz') or item.name.endswith('.tmp.npz'):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+        return entries
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
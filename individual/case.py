@@ -1,30 +1,134 @@
-from linear.statespace import Bode
+from linear.statespace import Bode, LazyStateSpace, ss_freqresp, write_statespace
+from individual.cache import CaseCache
+from individual.instrumentation import NULL_STATS
+import individual.writevariables as writevariables
+import individual.rotation as rotation
+import individual.h5utils as h5utils
 import numpy as np
+import collections.abc
 import glob
+import logging
 import os
-import h5py as h5
-import sharpy.utils.h5utils as h5utils
-import sharpy.linear.src.libss as libss
-import sharpy.utils.algebra as algebra
-import pickle
+
+logger = logging.getLogger(__name__)
+
+
+class LazyData:
+    """
+    Case data read from disk on first access.
+
+    The value is stored in the case under ``_<name>``. If it has not been loaded, the first access calls the case's
+    ``loader`` method, provided lazy loading is enabled and the path to the data, ``case.path_to_sys[source]``, is
+    known. A failed load is not retried until the data is released with :meth:`Case.release`. Data sharing a loader
+    (i.e. ``deflection`` and ``crv``) is recorded as attempted together, so the loader runs once for all of it.
+    """
+    def __init__(self, loader, source):
+        self.loader = loader
+        self.source = source
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.attr = '_' + name
+        # names of the data loaded by the same loader
+        self.attempts = frozenset(other_name for other_name, attr in vars(owner).items()
+                                  if isinstance(attr, LazyData) and attr.loader == self.loader)
+
+    def __get__(self, case, owner=None):
+        if case is None:
+            return self
+        value = getattr(case, self.attr)
+        if value is None and case.lazy and self.name not in case.load_attempts and self.source in case.path_to_sys:
+            case.load_attempts = case.load_attempts | self.attempts
+            getattr(case, self.loader)()
+            value = getattr(case, self.attr)
+        return value
+
+    def __set__(self, case, value):
+        setattr(case, self.attr, value)
+
+
+class CasePaths(collections.abc.MutableMapping):
+    """
+    Paths to the data of a case, by source (i.e. ``'eigs'``, ``'freqresp'``, ``'ss'``, ``'WriteVariablesTime'``,
+    ``'beam_modal_analysis'``, ``'AeroForcesCalculator'`` or ``'AeroMoments'``).
+
+    Paths are formatted on access from the templates shared by all cases of a set, with the case ``path``,
+    ``system`` and ``name`` as fields, e.g. ``'{path}/frequencyresponse/{system}.freqresp.h5'``. Paths assigned to a
+    single case are stored in the case and take precedence over the templates.
+    """
+    def __init__(self, case):
+        self.case = case
+
+    def __getitem__(self, source):
+        if self.case.path_overrides is not None and source in self.case.path_overrides:
+            return self.case.path_overrides[source]
+        template = self.case.path_templates[source]
+        return template.format(path=self.case.path, system=self.case.system, name=self.case.name)
+
+    def __contains__(self, source):
+        return source in self.case.path_templates or (self.case.path_overrides is not None
+                                                      and source in self.case.path_overrides)
+
+    def __setitem__(self, source, path):
+        if self.case.path_overrides is None:
+            self.case.path_overrides = dict()
+        self.case.path_overrides[source] = path
+
+    def __delitem__(self, source):
+        if self.case.path_overrides is None or source not in self.case.path_overrides:
+            raise KeyError(source)
+        del self.case.path_overrides[source]
+
+    def __iter__(self):
+        overrides = self.case.path_overrides if self.case.path_overrides is not None else dict()
+        return iter(dict.fromkeys(list(self.case.path_templates) + list(overrides)))
+
+    def __len__(self):
+        return sum(1 for _ in self)
 
 
 class Case:
-    """The basic element"""
+    """
+    The basic element
+
+    A compact record of a single case: instances have no ``__dict__``, the paths to the data are derived from
+    templates shared across the set (see :class:`CasePaths`) and, once the case is added to a set, its parameters are
+    a row of the set's :class:`batch.parameters.ParameterTable` rather than a copy.
+    """
+
+    __slots__ = ['_name', 'lazy', 'load_attempts', 'system', 'path', 'path_templates', 'path_overrides',
+                 'path_to_eigs', '_case_id', 'cache', 'stats', '_parameter_value', '_parameter_name', '_table', '_row',
+                 '_eigs', '_bode', '_ss', '_deflection', '_crv', '_aero_forces', '_aero_moments', 'stability',
+                 'beam_eigs']
+
+    eigs = LazyData('load_eigs', 'eigs')
+    bode = LazyData('load_bode', 'freqresp')
+    ss = LazyData('load_ss', 'ss')
+    deflection = LazyData('load_deflection', 'WriteVariablesTime')
+    crv = LazyData('load_deflection', 'WriteVariablesTime')
+    aero_forces = LazyData('load_forces', 'AeroForcesCalculator')
+    aero_moments = LazyData('load_moments', 'AeroMoments')
 
     def __init__(self, parameter_value, system, path_to_data, **kwargs):
         self._name = ''
 
+        self.lazy = kwargs.get('lazy', True)  #: load data on first access
+        self.load_attempts = frozenset()
+
         if type(parameter_value) is float:
-            self.parameter_value = parameter_value
-        elif len(parameter_value) > 0:
-            self.parameter_value = np.array(parameter_value, dtype=float)
-        # self.parameter_value = parameter_value  #: dict with parameter information (or a simple float)
-        self.parameter_name = kwargs.get('parameter_name', 'param')
+            self._parameter_value = parameter_value
+        else:
+            self._parameter_value = np.array(list(parameter_value), dtype=float)
+        case_info = kwargs.get('case_info')
+        if case_info is not None and 'parameter_name' not in kwargs:
+            self._parameter_name = list(case_info.keys())
+        else:
+            self._parameter_name = kwargs.get('parameter_name', 'param')
+        self._table = None  #: batch.parameters.ParameterTable holding the parameters once added to a set
+        self._row = -1
+
         self.system = system  #: system name (aeroelastic, aerodynamic or structural)
         self.path = path_to_data
-        case_info = kwargs.get('case_info')
-        self.case_info = {k: float(v) for k, v in case_info.items()}
 
         self.eigs = None
         self.bode = None
@@ -37,10 +141,14 @@ class Case:
         self.aero_moments = None
 
         self.path_to_eigs = kwargs.get('eigs', None)
-        self.path_to_sys = dict()
+        self.path_templates = kwargs.get('path_templates', dict())  #: source to path template, see CasePaths
+        self.path_overrides = None
 
         self._case_id = -1
 
+        self.cache = kwargs.get('cache', None)  #: individual.cache.CaseCache of parsed data
+        self.stats = kwargs.get('stats', NULL_STATS)  #: individual.instrumentation.LoadStats of the loaders
+
     @property
     def name(self):
         return self._name
@@ -60,6 +168,61 @@ class Case:
         else:
             print('Case id already set and should not be changed')
 
+    @property
+    def path_to_sys(self):
+        """CasePaths: Paths to the data of the case by source"""
+        return CasePaths(self)
+
+    @property
+    def parameter_value(self):
+        """np.ndarray: Parameter values, a view of the row of the case in its set's parameter table"""
+        if self._table is not None:
+            return self._table.values[self._row]
+        return self._parameter_value
+
+    @property
+    def parameter_name(self):
+        if self._table is not None:
+            return self._table.names
+        return self._parameter_name
+
+    @property
+    def case_info(self):
+        """dict: ``name: value`` of the case parameters"""
+        return dict(zip(self.parameter_name, np.atleast_1d(self.parameter_value).tolist()))
+
+    @property
+    def alpha(self):
+        """float: Second parameter of the case, taken as the angle of attack"""
+        try:
+            return float(np.atleast_1d(self.parameter_value)[1])
+        except IndexError:
+            raise AttributeError('Case has no alpha parameter')
+
+    def attach(self, table, row):
+        """
+        Stores the parameters of the case as a row of a set's parameter table.
+
+        Args:
+            table (batch.parameters.ParameterTable): Parameter table of the set.
+            row (int): Row of the case in the table.
+        """
+        self._table = table
+        self._row = row
+        self._parameter_value = None
+        self._parameter_name = None
+
+    def __getstate__(self):
+        # the parameters are copied out of the table rather than pickling the whole table with each case
+        state = {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+        state.update(_parameter_value=self.parameter_value.copy() if self._table is not None
+                     else self._parameter_value, _parameter_name=self.parameter_name, _table=None, _row=-1)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def load_eigs(self, refresh=False, path=None):
 
         if path is None:
@@ -67,103 +230,198 @@ class Case:
                 path = self.path_to_sys['eigs']
             except KeyError:
                 if self.path_to_eigs is None:
-                    print('No path to eigs has been given')
+                    logger.warning('No path to eigs has been given')
                     return
 
                 path = self.path_to_eigs
 
-        if self.eigs is None or refresh:
-            try:
-                self.eigs = np.loadtxt(path)
-            except OSError:
-                print('Unable to find eigenvalues at file {:s}'.format(os.path.abspath(path)))
+        if self._eigs is None or refresh:
+            with self.stats.stage('eigs'):
+                cached = self._get_cached('eigs', path, [path])
+                if cached is not None:
+                    self.eigs = cached['eigs']
+                    return
 
-    def load_bode(self, refresh=False, path=None):
-        print('Loading frequency data...')
+                try:
+                    self.eigs = np.loadtxt(path)
+                except OSError:
+                    logger.warning('Unable to find eigenvalues at file {:s}'.format(os.path.abspath(path)))
+                    self.stats.failure('eigs', path, 'file not found')
+                else:
+                    self.stats.add_io('eigs', [path])
+                    self._put_cached('eigs', path, [path], eigs=self.eigs)
+
+    def load_bode(self, refresh=False, path=None, on_disk=False):
+        """
+        Loads the frequency response.
+
+        Args:
+            refresh (bool): Unused.
+            path (str (optional)): Path to the ``freqresp.h5`` file.
+            on_disk (bool): Keep the file open and read each ``(m, p)`` channel only when requested, rather than
+                loading the full response into memory. See :meth:`linear.statespace.Bode.from_h5`.
+        """
+        logger.debug('Loading frequency data...')
         if path is None:
             try:
                 path = self.path_to_sys['freqresp']
             except KeyError:
                 path = glob.glob(self.path + 'frequencyresponse/{}.freqresp.h5'.format(self.system))[0]
 
-        try:
-            with h5.File(path, 'r') as freq_file_handle:
+        with self.stats.stage('bode'):
+            if on_disk:
+                try:
+                    self.bode = Bode.from_h5(path)
+                except OSError:
+                    logger.warning('No frequency data - %s' % path)
+                    self.stats.failure('bode', path, 'file not found')
+                return
+
+            cached = self._get_cached('bode', path, [path])
+            if cached is not None:
+                self.bode = Bode(wv=cached['wv'], yfreq=cached['yfreq'])
+                return
+
+            try:
                 # store files in dictionary
-                freq_dict = h5utils.load_h5_in_dict(freq_file_handle)
-        except OSError:
-            print('No frequency data - %s' % path)
-            return
-        # Could create a Bode object with ss gain, max gain etc
-        self.bode = Bode(wv=freq_dict['frequency'], yfreq=freq_dict['response'])
-        print('...loaded frequency data from {:s}'.format(path))
+                freq_dict = h5utils.load_h5(path)
+            except OSError:
+                logger.warning('No frequency data - %s' % path)
+                self.stats.failure('bode', path, 'file not found')
+                return
+            self.stats.add_io('bode', [path])
+            # Could create a Bode object with ss gain, max gain etc
+            self.bode = Bode(wv=freq_dict['frequency'], yfreq=freq_dict['response'])
+            self._put_cached('bode', path, [path], wv=self.bode.wv, yfreq=self.bode.yfreq)
+        logger.debug('...loaded frequency data from {:s}'.format(path))
 
     def load_ss(self, refresh=None, path=None):
+        """
+        Opens the state-space saved by SHARPy as a :class:`linear.statespace.LazyStateSpace`, whose matrices are
+        read on their first access.
+
+        If there is no state-space file, the matrices are taken from the case pickle. They are then saved next to it
+        in ``<pickle>.ss.h5``, which is used instead of the pickle while the latter is unchanged.
+        """
         if path is None:
             path = self.path_to_sys['ss']
 
-        try:
-            with h5.File(path, 'r') as f:
-                data = h5utils.load_h5_in_dict(f)
-            self.ss = libss.StateSpace(data['a'], data['b'], data['c'], data['d'], dt=data.get('dt', None))
-        except EnvironmentError:
-            # try and load from the pickle
-            print('Unable to load from h5 at {:s}, reverting to pickle'.format(path))
+        with self.stats.stage('ss'):
+            try:
+                self.ss = LazyStateSpace(path)
+                self.stats.add_io('ss', [path])
+                return
+            except (OSError, KeyError):
+                logger.info('Unable to load from h5 at {:s}, reverting to pickle'.format(path))
+
+            pickle_dir = self.path + '/' + self.path.split('/')[-1] + '.pkl'
             try:
-                pickle_dir = self.path + '/' + self.path.split('/')[-1] + '.pkl'
-                with open(pickle_dir, 'rb') as f:
-                    data = pickle.load(f)
-                    self.ss = data.linear.linear_system.ss
+                signature = CaseCache.signature([pickle_dir])
             except OSError:
-                print('Could not find pickle at {:s}'.format(pickle_dir))
+                logger.warning('Could not find pickle at {:s}'.format(pickle_dir))
+                self.stats.failure('ss', path, 'no h5 or pickle state-space')
                 return None
 
+            self.ss = self._load_pickled_ss(pickle_dir, signature)
+
+    def _load_pickled_ss(self, pickle_dir, signature):
+        extracted = pickle_dir + '.ss.h5'
+        try:
+            ss = LazyStateSpace(extracted)
+            if ss.attrs.get('source') == signature:
+                self.stats.add_io('ss', [extracted])
+                return ss
+        except (OSError, KeyError):
+            pass
+
+        import pickle
+        with open(pickle_dir, 'rb') as f:
+            ss = pickle.load(f).linear.linear_system.ss
+        self.stats.add_io('ss', [pickle_dir])
+
+        try:
+            write_statespace(extracted, ss.A, ss.B, ss.C, ss.D, dt=ss.dt, source=signature)
+        except OSError:
+            logger.warning('Unable to save the state-space of {:s} to {:s}'.format(pickle_dir, extracted))
+        return ss
+
+    def compute_bode(self, wv, method='eig'):
+        """
+        Computes the frequency response from the loaded state-space, for cases where no ``freqresp.h5`` is available.
+        See :func:`linear.statespace.freqresp`.
+
+        Args:
+            wv (np.ndarray): Frequency vector in rad/s.
+            method (str): ``'eig'`` or ``'schur'``.
+        """
+        if self.ss is None:
+            logger.warning('No state-space available to compute the frequency response')
+            return
+        self.bode = ss_freqresp(self.ss, wv, method=method)
+
     def load_deflection(self, refresh=None, path=None, reference_line=0):
         if path is None:
             try:
                 path = self.path_to_sys['WriteVariablesTime']
             except KeyError:
                 return None
+        with self.stats.stage('deflection'):
+            self._load_deflection(path)
+
+    def _load_deflection(self, path):
         node_files = glob.glob(path + 'pos*')
 
         if len(node_files) == 0:
-            print('No displacement files found at {}'.format(path))
+            logger.warning('No displacement files found at {}'.format(path))
+            self.stats.failure('deflection', path, 'no displacement files')
             return None
-        res = []
-        for file in node_files:
-            try:
-                res.append(np.loadtxt(file)[-1, :])
-            except IndexError:
-                res.append(np.loadtxt(file))  # single entry case in WriteVariablesTime
+        crv_files = glob.glob(path + 'psi*')
+
+        cached = self._get_cached('deflection', path, node_files + crv_files)
+        if cached is not None:
+            self.deflection = cached['deflection']
+            self.crv = cached.get('crv', None)
+            return
 
-        res = np.vstack(res)
         try:
-            order = res[:, 2].argsort()
-            res = res[order] # sort by spanwise index
-        except IndexError:
-            print(res.shape)
-            print(self.parameter_value)
-            print('Unable to order deflection by span')
+            deflection, crv = writevariables.read_nodes(node_files, crv_files)
+        except ValueError as error:
+            logger.warning('Unable to order deflection by span for case {}'.format(self.parameter_value))
+            self.stats.failure('deflection', path, str(error))
             return None
+        self.stats.add_io('deflection', node_files + crv_files)
 
-        self.deflection = res
+        self.deflection = deflection
+        if crv is None:
+            self._put_cached('deflection', path, node_files, deflection=self.deflection)
+            return None
 
-        # load crv if available
-        crv = np.zeros((self.deflection.shape[0], 3))
-        crv_files = glob.glob(path + 'psi*')
-        if len(crv_files) == 0:
+        self.crv = crv
+        self._put_cached('deflection', path, node_files + crv_files, deflection=self.deflection, crv=self.crv)
+
+    def _get_cached(self, kind, path, sources):
+        if self.cache is None:
             return None
-        else:
-            crv_list = [] # same order of nodes as position - we'll use that to order these
-            for ith, crv_file in enumerate(crv_files):
-                try:
-                    crv_list.append(np.loadtxt(crv_file)[-1, 1:])
-                except IndexError:
-                    crv_list.append(np.loadtxt(crv_file)[1:])
+        return self.cache.get(kind, path, sources)
 
-        for i in range(crv.shape[0]):
-            crv[i, :] = crv_list[order[i]]
+    def _put_cached(self, kind, path, sources, **arrays):
+        if self.cache is not None and not self.cache.put(kind, path, sources, **arrays):
+            self.stats.failure(kind, path, 'unable to write cache entry')
 
-        self.crv = crv
+    def release(self, *names):
+        """
+        Frees the loaded data such that it is read again on its next access.
+
+        Args:
+            *names (str): Data to release, i.e. ``'eigs'``, ``'bode'``, ``'ss'``, ``'deflection'``, ``'crv'``,
+                ``'aero_forces'`` or ``'aero_moments'``. All of them if none are given.
+        """
+        if len(names) == 0:
+            names = [name for name, attr in vars(Case).items() if isinstance(attr, LazyData)]
+
+        for name in names:
+            setattr(self, name, None)
+            self.load_attempts = self.load_attempts - {name}
 
     def load_beam_modal_analysis(self, refresh=None, path=None):
         if path is None:
@@ -177,15 +435,25 @@ class Case:
         self.beam_eigs = np.zeros((len(frequencies), 2))
         self.beam_eigs[:, 1] = frequencies
 
-    def get_deflection_at_line(self, reference_line=np.array([0, 0, 0.])):
-        if self.crv is None:
-            return self.deflection
+    def get_deflection_at_line(self, reference_line=np.array([0, 0, 0.]), nodes=None):
+        """
+        Position of a line offset from the beam nodes, rotated with each node.
+
+        Args:
+            reference_line (np.ndarray): Offset of the line from the beam, in the node frame.
+            nodes (array-like (optional)): Indices of the nodes at which to compute the position. All nodes if not
+                given.
 
-        def_at_line = np.zeros((self.deflection.shape[0], 3))
-        for i_node in range(def_at_line.shape[0]):
-            def_at_line[i_node] = self.deflection[i_node, -3:] + algebra.crv2rotation(self.crv[i_node]).dot(reference_line)
+        Returns:
+            np.ndarray: Position of the line at each node. If the rotation of the nodes is not available, the
+            deflection of the nodes is returned instead.
+        """
+        deflection = self.deflection if nodes is None else self.deflection[nodes]
+        if self.crv is None:
+            return deflection
 
-        return def_at_line
+        crv = self.crv if nodes is None else self.crv[nodes]
+        return deflection[..., -3:] + rotation.rotate_crv(crv, reference_line)
 
     def load_forces(self, path=None):
         if path is None:
@@ -194,13 +462,25 @@ class Case:
             except KeyError:
                 return None
 
-        self.aero_forces = np.loadtxt(path, skiprows=1, delimiter=',')
+        self.aero_forces = self._read_forces(path)
 
     def load_moments(self, path=None):
+        # the moments are not in the forces file, their path must be set explicitly
         if path is None:
             try:
-                path = self.path_to_sys['AeroForcesCalculator']
+                path = self.path_to_sys['AeroMoments']
             except KeyError:
                 return None
 
-        self.aero_moments = np.loadtxt(path, skiprows=1, delimiter=',')
+        self.aero_moments = self._read_forces(path)
+
+    def _read_forces(self, path):
+        with self.stats.stage('forces'):
+            try:
+                forces = np.loadtxt(path, skiprows=1, delimiter=',')
+            except OSError:
+                logger.warning('Unable to find aerodynamic loads at file {:s}'.format(os.path.abspath(path)))
+                self.stats.failure('forces', path, 'file not found')
+                return None
+            self.stats.add_io('forces', [path])
+        return forces
@@ -0,0 +1,40 @@
+"""
+Reading of the HDF5 files written by SHARPy, without importing SHARPy.
+
+``h5py`` is only imported when a file is read.
+"""
+
+
+def load_h5_in_dict(handle, path='/'):
+    """
+    Reads the contents of an open HDF5 file into nested dictionaries, as ``sharpy.utils.h5utils.load_h5_in_dict``.
+
+    Args:
+        handle (h5py.File): Open file.
+        path (str): Group to read.
+
+    Returns:
+        dict: Dataset values by name, with a nested dictionary for each group.
+    """
+    import h5py as h5
+
+    dictionary = dict()
+    for name, item in handle[path].items():
+        if isinstance(item, h5.Group):
+            dictionary[name] = load_h5_in_dict(handle, path + name + '/')
+        else:
+            dictionary[name] = item[()]
+    return dictionary
+
+
+def load_h5(path):
+    """
+    Reads the contents of an HDF5 file into nested dictionaries. See :func:`load_h5_in_dict`.
+
+    Raises:
+        OSError: if the file cannot be opened.
+    """
+    import h5py as h5
+
+    with h5.File(path, 'r') as handle:
+        return load_h5_in_dict(handle)
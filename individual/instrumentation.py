@@ -0,0 +1,136 @@
+"""
+Instrumentation of the case loaders.
+
+A :class:`LoadStats` object collects, for each loading stage (``glob``, ``parse``, ``eigs``, ``bode``, ``ss``,
+``deflection`` and ``forces``), the time spent, the number of calls, the files and bytes read and the failures.
+
+Instrumentation is off by default: loaders report to :data:`NULL_STATS`, whose methods do nothing.
+"""
+import collections
+import contextlib
+import os
+import threading
+import time
+
+
+class LoadStats:
+    """
+    Per-stage timers, I/O counters and failures of the loaders.
+
+    Safe to share between threads. Stats collected in other processes are combined with :meth:`merge`.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.time = collections.defaultdict(float)  #: seconds spent in each stage
+        self.calls = collections.defaultdict(int)  #: number of calls to each stage
+        self.files_read = collections.defaultdict(int)
+        self.bytes_read = collections.defaultdict(int)
+        self.failures = []  #: ``(stage, path, message)`` of each failure
+
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager timing a stage.
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.time[name] += elapsed
+                self.calls[name] += 1
+
+    def add_io(self, name, paths):
+        """
+        Records the files read in a stage.
+        """
+        n_bytes = 0
+        for path in paths:
+            try:
+                n_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.files_read[name] += len(paths)
+            self.bytes_read[name] += n_bytes
+
+    def failure(self, name, path, message):
+        with self._lock:
+            self.failures.append((name, path, message))
+
+    def merge(self, other):
+        """
+        Adds the stats collected in ``other`` (e.g. in a worker process) to these.
+        """
+        if not other.enabled or other is self:
+            return
+        with self._lock:
+            for counter in ['time', 'calls', 'files_read', 'bytes_read']:
+                for name, value in getattr(other, counter).items():
+                    getattr(self, counter)[name] += value
+            self.failures.extend(other.failures)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Stage name to its time, calls, files and bytes read, and number of failures.
+        """
+        stages = sorted(set(self.time) | set(self.files_read))
+        failures = collections.Counter(name for name, _, _ in self.failures)
+        return {name: {'time': self.time[name],
+                       'calls': self.calls[name],
+                       'files_read': self.files_read[name],
+                       'bytes_read': self.bytes_read[name],
+                       'failures': failures[name]} for name in stages}
+
+    def __str__(self):
+        lines = ['{:<12s}{:>10s}{:>8s}{:>8s}{:>14s}{:>10s}'.format('stage', 'time [s]', 'calls', 'files', 'bytes',
+                                                                  'failures')]
+        for name, entry in self.summary().items():
+            lines.append('{:<12s}{:>10.3f}{:>8d}{:>8d}{:>14d}{:>10d}'.format(name, entry['time'], entry['calls'],
+                                                                            entry['files_read'], entry['bytes_read'],
+                                                                            entry['failures']))
+        return '\n'.join(lines)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class NullStats:
+    """
+    Disabled instrumentation, every method is a no-op.
+    """
+    enabled = False
+
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def add_io(self, name, paths):
+        pass
+
+    def failure(self, name, path, message):
+        pass
+
+    def merge(self, other):
+        pass
+
+    def summary(self):
+        return dict()
+
+    def __reduce__(self):
+        return 'NULL_STATS'  # unpickled as the module singleton
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,69 @@
+"""
+Vectorised rotation helpers.
+
+Equivalent to those in ``sharpy.utils.algebra`` but operating on stacks of Cartesian rotation vectors (CRV) of shape
+``... x 3`` at once.
+"""
+import numpy as np
+
+
+def crv2rotation(psi):
+    r"""
+    Rotation matrices from Cartesian rotation vectors (Rodrigues' formula)
+
+    .. math::
+        C(\psi) = I + \sin\|\psi\| \tilde{n} + (1 - \cos\|\psi\|) \tilde{n}\tilde{n}, \quad n = \psi / \|\psi\|
+
+    Args:
+        psi (np.ndarray): CRVs of shape ``... x 3``.
+
+    Returns:
+        np.ndarray: Rotation matrices of shape ``... x 3 x 3``.
+    """
+    psi = np.asarray(psi, dtype=float)
+    return rotate_crv(psi[..., None, :], np.eye(3)).swapaxes(-1, -2)
+
+
+def rotate_crv(psi, vector):
+    r"""
+    Rotates vectors by the rotation given by CRVs, i.e. ``C(psi).dot(vector)``, without forming the rotation matrices
+
+    .. math::
+        C(\psi) v = v + \sin\|\psi\| (n \times v) + (1 - \cos\|\psi\|) n \times (n \times v)
+
+    Args:
+        psi (np.ndarray): CRVs of shape ``... x 3``.
+        vector (np.ndarray): Vectors of shape ``... x 3``, broadcast against ``psi``.
+
+    Returns:
+        np.ndarray: Rotated vectors.
+    """
+    psi = np.asarray(psi, dtype=float)
+    vector = np.asarray(vector, dtype=float)
+
+    norm_psi = np.linalg.norm(psi, axis=-1)[..., None]
+    small = norm_psi < 1e-15
+
+    # second order expansion for small rotations, as in sharpy.utils.algebra.crv2rotation
+    safe_norm = np.where(small, 1., norm_psi)
+    normal = np.where(small, psi, psi / safe_norm)
+    sin_term = np.where(small, 1., np.sin(norm_psi))
+    cos_term = np.where(small, 0.5, 1. - np.cos(norm_psi))
+
+    n_cross_v = np.cross(normal, vector)
+    return vector + sin_term * n_cross_v + cos_term * np.cross(normal, n_cross_v)
+
+
+def pitch2rotation(pitch):
+    """
+    Rotation matrix of a pitch (rotation about the ``y`` axis), as
+    ``sharpy.utils.algebra.quat2rotation(sharpy.utils.algebra.euler2quat(np.array([0, pitch, 0])))``.
+
+    Args:
+        pitch (float): Pitch angle in radians.
+
+    Returns:
+        np.ndarray: ``3 x 3`` rotation matrix ``[[cos, 0, sin], [0, 1, 0], [-sin, 0, cos]]``.
+    """
+    c, s = np.cos(pitch), np.sin(pitch)
+    return np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
@@ -0,0 +1,125 @@
+"""
+Readers for the node files written by SHARPy's ``WriteVariablesTime`` post-processor.
+
+Only the final time step of each ``pos*`` and ``psi*`` file is of interest, so rather than parsing the full files,
+only their last line is read and all lines are parsed in a single call.
+"""
+import concurrent.futures
+import glob
+import os
+import numpy as np
+
+
+def read_last_line(path, block_size=1024):
+    """
+    Reads the last non-empty line of a text file by seeking backwards from its end.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Last line of the file.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            lines = data.rstrip().rsplit(b'\n', 1)
+            if len(lines) == 2:
+                return lines[1].decode()
+
+    return data.strip().decode()
+
+
+def read_last_rows(files):
+    """
+    Final row of each of the given text files.
+
+    Args:
+        files (list): Paths to the files. All of them must have the same number of columns.
+
+    Returns:
+        np.ndarray: Array of shape ``n_files x n_columns``.
+
+    Raises:
+        ValueError: if any file is empty, or its last row has a different number of columns or non-numeric values
+            (e.g. a file still being written).
+    """
+    lines = [read_last_line(file) for file in files]
+    n_columns = {len(line.split()) for line in lines}
+    if len(n_columns) != 1 or 0 in n_columns:
+        raise ValueError('The last rows of the files have different numbers of columns {}'.format(n_columns))
+
+    rows = np.fromstring(' '.join(lines), sep=' ')
+    if rows.size != len(lines) * n_columns.pop():
+        raise ValueError('Unable to parse the last rows of the files')
+    return rows.reshape(len(lines), -1)
+
+
+def read_nodes(node_files, crv_files=None):
+    """
+    Position and, if available, Cartesian rotation vector of each node at the last time step, ordered along the span.
+
+    Each ``pos*`` file is paired with the ``psi*`` file of the same node by sorting both lists of files by name.
+
+    Args:
+        node_files (list): Paths to the ``pos*`` files.
+        crv_files (list (optional)): Paths to the ``psi*`` files.
+
+    Returns:
+        tuple: Deflection array of shape ``n_nodes x 4`` (time step and position) and the ``n_nodes x 3`` CRV array
+        (``None`` if there are no ``psi*`` files).
+
+    Raises:
+        ValueError: if the files have inconsistent numbers of columns.
+    """
+    node_files = sorted(node_files)
+    deflection = read_last_rows(node_files)
+    order = deflection[:, 2].argsort()  # sort by spanwise coordinate
+
+    if crv_files is None or len(crv_files) == 0:
+        return deflection[order], None
+
+    crv = read_last_rows(sorted(crv_files))[:, 1:]
+    return deflection[order], crv[order]
+
+
+def read_case_nodes(path):
+    """
+    Reads the nodes of a case, see :func:`read_nodes`.
+
+    Args:
+        path (str): Prefix of the node files, e.g. ``<case>/WriteVariablesTime/*``.
+
+    Returns:
+        tuple: Deflection and CRV arrays, ``(None, None)`` if there are no ``pos*`` files.
+    """
+    node_files = glob.glob(path + 'pos*')
+    if len(node_files) == 0:
+        return None, None
+    return read_nodes(node_files, glob.glob(path + 'psi*'))
+
+
+def bulk_read_nodes(case_paths, workers=None):
+    """
+    Reads the nodes of several cases.
+
+    Args:
+        case_paths (list): Paths to the case directories.
+        workers (int (optional)): Number of threads among which to share the cases.
+
+    Returns:
+        list: ``(deflection, crv)`` tuple of each case, in the order of ``case_paths``.
+    """
+    paths = [case_path + '/WriteVariablesTime/*' for case_path in case_paths]
+    if workers is None or workers <= 1:
+        return [read_case_nodes(path) for path in paths]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_case_nodes, paths))
@@ -1,18 +1,21 @@
+from individual.instrumentation import NULL_STATS
 import glob
+import logging
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 
 class Stability:
-    def __init__(self, path):
+    def __init__(self, path, stats=NULL_STATS):
+        self.path = path
 
         try:
-            file = glob.glob(path + '/velocity*.dat')[-1]
-            res = np.loadtxt(file)
-        except IndexError:
-            print('No velocity data in path {:s}'.format(path))
-            raise FileNotFoundError('Unable to find velocity file data')
-        self.eigs = res[:, 1:]
-        self.v = res[:, 0]  # raw speeds
+            self.v, self.eigs = read_velocity_sweep(path)  # raw speeds
+        except FileNotFoundError:
+            logger.warning('No velocity data in path {:s}'.format(path))
+            stats.failure('stability', path, 'no velocity data')
+            raise
         self.damp = None
         self.v_f = None  # filtered for any freq limits specified
         self.frequency = None
@@ -27,7 +30,156 @@ class Stability:
         np.savetxt(output_folder + '/vel_eigs.txt', np.column_stack((self.v, self.eigs)))
 
 
+class StabilitySet:
+    """
+    Velocity sweeps of several cases stacked in single arrays, processed together.
+
+    Args:
+        sources (list): For each case, the path to its ``stability`` directory or an already loaded
+            :class:`Stability`. Cases without velocity data have an empty sweep.
+        parameter_names (list (optional)): Names of the parameters of the cases.
+        parameter_values (np.ndarray (optional)): Parameters of each case of shape ``n_cases x n_parameters``,
+            written next to the case number by :meth:`save_to_file`.
+
+    Attributes:
+        v (np.ndarray): Velocity of each eigenvalue of all sweeps.
+        eigs (np.ndarray): Eigenvalues of all sweeps of shape ``n x 2``.
+        groups (np.ndarray): Case of each eigenvalue.
+        v_f (np.ndarray): Velocity of each eigenvalue kept by the filters of :meth:`process`.
+        damp (np.ndarray): Damping of each filtered eigenvalue.
+        frequency (np.ndarray): Natural frequency of each filtered eigenvalue.
+        groups_f (np.ndarray): Case of each filtered eigenvalue.
+        crossing_groups (np.ndarray): Case of each crossing of the stability boundary.
+        crossing_speeds (np.ndarray): Speed of each crossing of the stability boundary.
+        flutter_speed (np.ndarray): Lowest crossing speed of each case, ``np.nan`` if it does not cross.
+    """
+    def __init__(self, sources, parameter_names=None, parameter_values=None):
+        self.sources = list(sources)
+        self.n_cases = len(self.sources)
+
+        self.parameter_names = list(parameter_names) if parameter_names is not None else []
+        if parameter_values is None:
+            parameter_values = np.zeros((self.n_cases, 0))
+        self.parameter_values = np.asarray(parameter_values, dtype=float).reshape(self.n_cases,
+                                                                                   len(self.parameter_names))
+
+        v_list = []
+        eigs_list = []
+        for source in self.sources:
+            if isinstance(source, Stability):
+                v, eigs = source.v, source.eigs
+            else:
+                try:
+                    v, eigs = read_velocity_sweep(source)
+                except FileNotFoundError:
+                    v, eigs = np.zeros(0), np.zeros((0, 2))
+            v_list.append(v)
+            eigs_list.append(eigs)
+
+        self.groups = np.repeat(np.arange(self.n_cases), [len(v) for v in v_list])
+        self.v = np.concatenate(v_list) if self.n_cases > 0 else np.zeros(0)
+        self.eigs = np.concatenate(eigs_list) if self.n_cases > 0 else np.zeros((0, 2))
+
+        self.v_f = None
+        self.damp = None
+        self.frequency = None
+        self.groups_f = None
+        self.crossing_groups = None
+        self.crossing_speeds = None
+        self.flutter_speed = None
+
+    def process(self, instability_damping=0., vel_vmin=0., **kwargs):
+        """
+        Filters the eigenvalues of all cases with a single mask and finds the crossings of the stability boundary.
+
+        Args:
+            instability_damping (float): Damping at the stability boundary.
+            vel_vmin (float): Velocities below this one are ignored in the search for crossings.
+            **kwargs: Filter settings, see :func:`modes`.
+        """
+        conditions, damp, wn = modes_mask(self.v, self.eigs, **kwargs)
+        self.v_f = self.v[conditions]
+        self.damp = damp[conditions]
+        self.frequency = wn[conditions]
+        self.groups_f = self.groups[conditions]
+
+        self.crossing_groups, self.crossing_speeds = find_flutter_speed_groups(
+            self.v_f, self.damp, self.groups_f, instability_damping=instability_damping, vel_vmin=vel_vmin)
+        self.flutter_speed = first_crossing(self.crossing_groups, self.crossing_speeds, self.n_cases)
+
+    def case(self, i_case):
+        """
+        Filtered velocity, damping and frequency of a single case.
+        """
+        in_case = self.groups_f == i_case
+        return self.v_f[in_case], self.damp[in_case], self.frequency[in_case]
+
+    def save_to_file(self, output_folder):
+        """
+        Writes the results of all cases to a single set of files:
+
+            * ``stability_analysis.txt``: case, parameters, velocity, damping and frequency of each filtered
+              eigenvalue.
+            * ``vel_eigs.txt``: case, parameters, velocity and eigenvalue of each raw eigenvalue.
+            * ``flutter.txt``: case, parameters, lowest flutter speed and source of each case.
+        """
+        parameters = ' '.join(['case'] + self.parameter_names)
+        np.savetxt(output_folder + '/stability_analysis.txt',
+                   np.column_stack((self.groups_f, self.parameter_values[self.groups_f], self.v_f, self.damp,
+                                    self.frequency)),
+                   header=parameters + ' velocity damping frequency')
+        np.savetxt(output_folder + '/vel_eigs.txt',
+                   np.column_stack((self.groups, self.parameter_values[self.groups], self.v, self.eigs)),
+                   header=parameters + ' velocity real imag')
+
+        with open(output_folder + '/flutter.txt', 'w') as fid:
+            fid.write('# ' + parameters + ' flutter_speed[m/s] source\n')
+            for i_case, (speed, source) in enumerate(zip(self.flutter_speed, self.sources)):
+                if isinstance(source, Stability):
+                    source = source.path
+                values = ''.join(' {:g}'.format(value) for value in self.parameter_values[i_case])
+                fid.write('{:d}{:s} {:.4f} {:s}'.format(i_case, values, speed, source).rstrip() + '\n')
+
+
+def read_velocity_sweep(path):
+    """
+    Reads the last ``velocity*.dat`` file of a ``stability`` directory.
+
+    Returns:
+        tuple: Velocity of shape ``n`` and eigenvalues of shape ``n x 2``.
+
+    Raises:
+        FileNotFoundError: if there is no velocity file.
+    """
+    try:
+        file = glob.glob(path + '/velocity*.dat')[-1]
+    except IndexError:
+        raise FileNotFoundError('Unable to find velocity file data')
+    res = np.loadtxt(file, ndmin=2)
+    return res[:, 0], res[:, 1:]
+
+
 def modes(v, eigs, **kwargs):
+    conditions, damp, wn = modes_mask(v, eigs, **kwargs)
+
+    vc = v[conditions]
+    dampc = damp[conditions]
+    wnc = wn[conditions]
+    return vc, dampc, wnc
+
+
+def modes_mask(v, eigs, **kwargs):
+    """
+    Damping and natural frequency of each eigenvalue, and the mask of those kept by the :func:`modes` filters.
+
+    Args:
+        v (np.ndarray): Velocity of each eigenvalue.
+        eigs (np.ndarray): Eigenvalues of shape ``n x 2``.
+        **kwargs: ``use_hz``, ``vmin``, ``vmax``, ``wdmin`` and ``wdmax`` filter settings.
+
+    Returns:
+        tuple: Boolean mask, damping and natural frequency.
+    """
     hz = kwargs.get('use_hz', False)
 
     wn = np.sqrt(eigs[:, 0] ** 2 + eigs[:, 1] ** 2)
@@ -44,40 +196,142 @@ def modes(v, eigs, **kwargs):
 
     conditions = (eigs[:, 0] > -50) * (eigs[:, 1] > wdmin) * (eigs[:, 1] < wdmax) * (v >= vmin) * (v <= vmax)
 
-    vc = v[conditions]
-    dampc = damp[conditions]
-    wnc = wn[conditions]
-    return vc, dampc, wnc
+    return conditions, damp, wn
 
 
 def max_mode(v, damp):
-    vels = np.unique(v)
-    max_damp = np.zeros(len(vels))
-    for ith, vel in enumerate(vels):
-        max_damp[ith] = np.max(damp[v == vel])
+    """
+    Maximum damping at each velocity.
 
+    Args:
+        v (np.ndarray): Velocity of each eigenvalue.
+        damp (np.ndarray): Damping of each eigenvalue.
+
+    Returns:
+        tuple: Unique velocities, in ascending order, and their maximum damping.
+    """
+    _, vels, max_damp = max_mode_groups(v, damp)
     return vels, max_damp
 
 
+def max_mode_groups(v, damp, groups=None):
+    """
+    Maximum damping at each velocity of each group (i.e. case) in a single sorted pass.
+
+    Args:
+        v (np.ndarray): Velocity of each eigenvalue.
+        damp (np.ndarray): Damping of each eigenvalue.
+        groups (np.ndarray (optional)): Integer group of each eigenvalue.
+
+    Returns:
+        tuple: Group, velocity and maximum damping of each unique ``(group, velocity)`` pair, sorted by group and
+        velocity.
+    """
+    v = np.asarray(v)
+    damp = np.asarray(damp)
+    if groups is None:
+        groups = np.zeros(len(v), dtype=int)
+
+    if len(v) == 0:
+        return groups[:0], v[:0], damp[:0]
+
+    order = np.lexsort((v, groups))
+    groups = groups[order]
+    v = v[order]
+
+    new_entry = np.ones(len(v), dtype=bool)
+    new_entry[1:] = (groups[1:] != groups[:-1]) | (v[1:] != v[:-1])
+    start = np.flatnonzero(new_entry)
+
+    return groups[start], v[start], np.maximum.reduceat(damp[order], start)
+
+
 def find_flutter_speed(v, damp, instability_damping=0., vel_vmin=0.):
-    vu, max_damp = max_mode(v, damp)
-    max_damp = max_damp[vu >= vel_vmin]
-    vu = vu[vu >= vel_vmin]
+    """
+    Speeds at which the maximum damping crosses ``instability_damping``, linearly interpolated between velocities.
+
+    Args:
+        v (np.ndarray): Velocity of each eigenvalue.
+        damp (np.ndarray): Damping of each eigenvalue.
+        instability_damping (float): Damping at the stability boundary.
+        vel_vmin (float): Velocities below this one are ignored.
+
+    Returns:
+        list: Crossing speeds in ascending order.
+    """
+    _, flutter_speeds = find_flutter_speed_groups(v, damp, instability_damping=instability_damping,
+                                                  vel_vmin=vel_vmin)
+
+    return flutter_speeds.tolist()
+
+
+def find_flutter_speed_groups(v, damp, groups=None, instability_damping=0., vel_vmin=0.):
+    """
+    Vectorised :func:`find_flutter_speed` over several groups (i.e. cases) at once.
+
+    Args:
+        v (np.ndarray): Velocity of each eigenvalue.
+        damp (np.ndarray): Damping of each eigenvalue.
+        groups (np.ndarray (optional)): Integer group of each eigenvalue.
+        instability_damping (float): Damping at the stability boundary.
+        vel_vmin (float): Velocities below this one are ignored.
+
+    Returns:
+        tuple: Group and speed of every crossing, sorted by group and speed.
+    """
+    groups, vu, max_damp = max_mode_groups(v, damp, groups)
+
+    above_vmin = vu >= vel_vmin
+    groups = groups[above_vmin]
+    vu = vu[above_vmin]
+    max_damp = max_damp[above_vmin]
+
     stable = max_damp >= instability_damping
-    flutter_speeds = []
-    if stable[0] is False:
-        flutter_speeds.append(vu[0])
-    for i in range(1, len(vu)):
-        axis_crossed = int(stable[i-1]) + int(stable[i])
-        if axis_crossed == 1:
-            x = np.array(max_damp[i-1:i+1])
-            order = np.argsort(x)
-            x = x[order]
-            y = np.array(vu[i-1:i+1])[order]
-            v = np.interp(0, x, y, right=0, left=0)
-            flutter_speeds.append(v)
-
-    return flutter_speeds
+    crossing = np.flatnonzero((stable[1:] != stable[:-1]) & (groups[1:] == groups[:-1]))
+
+    d0 = max_damp[crossing]
+    d1 = max_damp[crossing + 1]
+    v0 = vu[crossing]
+    v1 = vu[crossing + 1]
+    flutter_speeds = v0 + (instability_damping - d0) * (v1 - v0) / (d1 - d0)
+
+    return groups[crossing], flutter_speeds
+
+
+def flutter_speeds(v_list, damp_list, instability_damping=0., vel_vmin=0.):
+    """
+    First flutter speed of each of a set of velocity sweeps.
+
+    Args:
+        v_list (list): Velocity arrays of each sweep.
+        damp_list (list): Damping arrays of each sweep.
+        instability_damping (float): Damping at the stability boundary.
+        vel_vmin (float): Velocities below this one are ignored.
+
+    Returns:
+        np.ndarray: First crossing speed of each sweep, ``np.nan`` if the sweep does not cross the boundary.
+    """
+    n_sweeps = len(v_list)
+    if n_sweeps == 0:
+        return np.zeros(0)
+    groups = np.repeat(np.arange(n_sweeps), [len(v) for v in v_list])
+    crossing_groups, speeds = find_flutter_speed_groups(np.concatenate(v_list), np.concatenate(damp_list), groups,
+                                                        instability_damping=instability_damping, vel_vmin=vel_vmin)
+
+    return first_crossing(crossing_groups, speeds, n_sweeps)
+
+
+def first_crossing(crossing_groups, speeds, n_groups):
+    """
+    Lowest crossing speed of each group, ``np.nan`` for groups without crossings. See
+    :func:`find_flutter_speed_groups`.
+    """
+    first_speed = np.full(n_groups, np.nan)
+    # crossings are sorted by speed within each group, so the first in each group is the lowest
+    first_groups, first_index = np.unique(crossing_groups, return_index=True)
+    first_speed[first_groups] = speeds[first_index]
+
+    return first_speed
 
 
 def save_to_file(output_folder, vel, damp, fn, flutter_speed):
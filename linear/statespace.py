@@ -1,40 +1,401 @@
+import concurrent.futures
+import functools
 import numpy as np
-import matplotlib.pyplot as plt
 
 class Bode:
+    """
+    Frequency response of a system.
+
+    The magnitude and phase are computed on first access. When ``yfreq`` is an ``h5py`` dataset (see
+    :meth:`Bode.from_h5`) calling the object on a single ``(m, p)`` channel reads and processes only that channel.
+
+    Args:
+        wv (np.ndarray): Frequency vector.
+        yfreq (np.ndarray or h5py.Dataset): Frequency response of dimensions ``p, m, wv``.
+    """
     def __init__(self, wv, yfreq):
         self.wv = wv
         self.yfreq = yfreq
 
-        self.mag = 20 * np.log10(np.abs(yfreq))
-        self.phase = np.angle(yfreq)
+        self._mag = None
+        self._phase = None
+
+        self.file_handle = None  #: open h5 file when the response is read on demand
+
+    @classmethod
+    def from_h5(cls, path):
+        """
+        Frequency response backed by the ``response`` dataset of a ``freqresp.h5`` file, which is kept open until
+        :meth:`close` is called.
+        """
+        import h5py as h5
+
+        file_handle = h5.File(path, 'r')
+        bode = cls(wv=file_handle['frequency'][()], yfreq=file_handle['response'])
+        bode.file_handle = file_handle
+        return bode
 
-        self.ss0 = yfreq[:, :, 0]
+    def close(self):
+        if self.file_handle is not None:
+            self.file_handle.close()
+            self.file_handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def mag(self):
+        if self._mag is None:
+            self._mag = 20 * np.log10(np.abs(self.yfreq[()]))
+        return self._mag
+
+    @property
+    def phase(self):
+        if self._phase is None:
+            self._phase = np.angle(self.yfreq[()])
+        return self._phase
+
+    @property
+    def ss0(self):
+        return self.yfreq[:, :, 0]
 
     def __call__(self, m, p, plot='mag', deg=False):
 
         if plot == 'mag' or plot == 'm':
-            return self.wv, self.mag[p, m, :]
+            if self._mag is not None:
+                return self.wv, self._mag[p, m, :]
+            return self.wv, 20 * np.log10(np.abs(self.yfreq[p, m, :]))
         elif plot == 'pha' or plot == 'p' or plot == 'phase':
-            if deg:
-                phase = self.phase * 180 / np.pi
+            if self._phase is not None:
+                phase = self._phase[p, m, :]
             else:
-                phase = self.phase
+                phase = np.angle(self.yfreq[p, m, :])
+            if deg:
+                phase = phase * 180 / np.pi
 
-            return self.wv, phase[p, m, :]
+            return self.wv, phase
 
     def plot(self, ax, m, p, deg=True, **kwargs):
         ax[0].semilogx(*self(m, p, plot='mag'), **kwargs)
         ax[1].semilogx(*self(m, p, plot='phase', deg=deg), **kwargs)
 
 
+def freqresp(a, b, c, d, wv, dt=None, method='eig', chunk_size=None):
+    r"""
+    Frequency response of a state-space system over a full frequency vector
+
+    .. math::
+        H(s) = C (sI - A)^{-1} B + D, \quad s = j\omega \text{ or } s = e^{j\omega \Delta t}
+
+    The system is reduced once and then evaluated at all frequencies:
+
+        * ``'eig'``: eigendecomposition :math:`A = V\Lambda V^{-1}`, such that
+          :math:`H(s) = CV (sI - \Lambda)^{-1} V^{-1}B + D` is evaluated for all frequencies with a single ``einsum``.
+
+        * ``'schur'``: complex Schur form :math:`A = ZTZ^H`, with a triangular solve at each frequency. Slower but
+          robust for defective or highly non-normal ``A``. Requires ``scipy``.
+
+    Args:
+        a (np.ndarray): State matrix (dense or ``scipy.sparse``).
+        b (np.ndarray): Input matrix.
+        c (np.ndarray): Output matrix.
+        d (np.ndarray): Feedthrough matrix.
+        wv (np.ndarray): Frequency vector in rad/s.
+        dt (float (optional)): Time step of a discrete-time system.
+        method (str): ``'eig'`` or ``'schur'``.
+        chunk_size (int (optional)): Number of frequencies evaluated at a time (``'eig'`` method).
+
+    Returns:
+        np.ndarray: Frequency response of dimensions ``p, m, wv``.
+    """
+    a, b, c, d = [dense(matrix) for matrix in (a, b, c, d)]
+    wv = np.asarray(wv)
+    if dt is None:
+        s = 1j * wv
+    else:
+        s = np.exp(1j * wv * dt)
+
+    yfreq = np.zeros((c.shape[0], b.shape[1], len(wv)), dtype=complex)
+
+    if method == 'eig':
+        eigenvalues, eigenvectors = np.linalg.eig(a)
+        c_modal = c.dot(eigenvectors)
+        b_modal = np.linalg.solve(eigenvectors, b)
+
+        if chunk_size is None:
+            chunk_size = len(wv)
+        for start in range(0, len(wv), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            resolvent = 1 / (s[None, chunk] - eigenvalues[:, None])
+            yfreq[:, :, chunk] = np.einsum('pn,nw,nm->pmw', c_modal, resolvent, b_modal)
+    elif method == 'schur':
+        try:
+            import scipy.linalg as sclalg
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError('The schur method requires scipy')
+        t, z = sclalg.schur(a, output='complex')
+        c_schur = c.dot(z)
+        b_schur = np.conj(z.T).dot(b)
+        eye = np.eye(a.shape[0])
+        for i_omega, s_i in enumerate(s):
+            yfreq[:, :, i_omega] = c_schur.dot(sclalg.solve_triangular(s_i * eye - t, b_schur))
+    else:
+        raise NameError('Method can only be eig or schur')
+
+    yfreq += d[:, :, None]
+
+    return yfreq
+
+
+def ss_freqresp(ss, wv, method='eig', chunk_size=None):
+    """
+    Frequency response of a state-space object with ``A``, ``B``, ``C``, ``D`` and ``dt`` attributes (such as
+    ``sharpy.linear.src.libss.StateSpace``). See :func:`freqresp`.
+
+    Returns:
+        Bode: Frequency response.
+    """
+    return Bode(wv, freqresp(ss.A, ss.B, ss.C, ss.D, wv, dt=ss.dt, method=method, chunk_size=chunk_size))
+
+
+def bulk_freqresp(state_spaces, wv, method='eig', workers=None):
+    """
+    Frequency responses of several state-space systems, optionally computed in parallel on a process pool.
+
+    Args:
+        state_spaces (list): State-space objects, see :func:`ss_freqresp`.
+        wv (np.ndarray): Frequency vector in rad/s.
+        method (str): ``'eig'`` or ``'schur'``.
+        workers (int (optional)): Number of processes. Computed serially if ``None``.
+
+    Returns:
+        list: ``Bode`` of each system.
+    """
+    systems = [(dense(ss.A), ss.B, ss.C, ss.D, ss.dt) for ss in state_spaces]
+    evaluate = functools.partial(_freqresp_system, wv=wv, method=method)
+    if workers is None or workers <= 1:
+        yfreq = [evaluate(system) for system in systems]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            yfreq = list(executor.map(evaluate, systems))
+
+    return [Bode(wv, y) for y in yfreq]
+
+
+def _freqresp_system(system, wv, method):
+    a, b, c, d, dt = system
+    return freqresp(a, b, c, d, wv, dt=dt, method=method)
+
+
+def dense(matrix):
+    """Dense ``np.ndarray`` of a (possibly sparse) matrix"""
+    try:
+        return matrix.toarray()
+    except AttributeError:
+        return np.asarray(matrix)
+
+
+class LazyStateSpace:
+    """
+    State-space backed by an HDF5 file, whose matrices are only read when accessed.
+
+    The ``a``, ``b``, ``c`` and ``d`` datasets are read on the first access of ``A``, ``B``, ``C`` and ``D``.
+    Contiguous, uncompressed datasets are memory-mapped rather than read into memory. A matrix stored as a group of
+    ``data``, ``indices`` and ``indptr`` datasets with a ``shape`` attribute (see :func:`write_statespace`) is read as
+    a ``scipy.sparse.csr_matrix``.
+
+    Any other attribute is that of the ``sharpy.linear.src.libss.StateSpace`` built on its first use, see
+    :meth:`statespace`.
+
+    Args:
+        path (str): Path to the HDF5 file.
+        group (str (optional)): Group of the file holding the matrices, the root by default.
+
+    Attributes:
+        dt (float): Time step. ``None`` for continuous time systems.
+        attrs (dict): Attributes of the group.
+
+    Raises:
+        OSError: if the file cannot be opened.
+        KeyError: if any of the matrices is missing.
+    """
+    def __init__(self, path, group='/'):
+        import h5py as h5
+
+        self.path = path
+        self.group = group
+        self._matrices = dict()
+        self._ss = None
+
+        with h5.File(path, 'r') as f:
+            grp = f[group]
+            self._shapes = {name: _stored_shape(grp[name]) for name in ['a', 'b', 'c', 'd']}
+            self.dt = np.asarray(grp['dt'][()]).item() if 'dt' in grp and grp['dt'].shape is not None else None
+            self.attrs = dict(grp.attrs)
+
+    @property
+    def A(self):
+        return self._matrix('a')
+
+    @property
+    def B(self):
+        return self._matrix('b')
+
+    @property
+    def C(self):
+        return self._matrix('c')
+
+    @property
+    def D(self):
+        return self._matrix('d')
+
+    @property
+    def states(self):
+        return self._shapes['a'][0]
+
+    @property
+    def inputs(self):
+        return self._shapes['b'][1]
+
+    @property
+    def outputs(self):
+        return self._shapes['c'][0]
+
+    def statespace(self):
+        """SHARPy state-space of the matrices, see :func:`state_space`"""
+        if self._ss is None:
+            self._ss = state_space(self.A, self.B, self.C, self.D, dt=self.dt)
+        return self._ss
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.statespace(), name)
+
+    def __getstate__(self):
+        # matrices are read again from the file rather than copied
+        return {'path': self.path, 'group': self.group, 'dt': self.dt, 'attrs': self.attrs, '_shapes': self._shapes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._matrices = dict()
+        self._ss = None
+
+    def _matrix(self, name):
+        if name not in self._matrices:
+            self._matrices[name] = _read_matrix(self.path, self.group, name)
+        return self._matrices[name]
+
+
+def _stored_shape(item):
+    if 'shape' in item.attrs:
+        return tuple(int(n) for n in item.attrs['shape'])
+    return item.shape
+
+
+def _read_matrix(path, group, name):
+    import h5py as h5
+
+    with h5.File(path, 'r') as f:
+        item = f[group][name]
+        if isinstance(item, h5.Group):
+            import scipy.sparse as sp
+            return sp.csr_matrix((item['data'][()], item['indices'][()], item['indptr'][()]),
+                                 shape=_stored_shape(item))
+
+        offset = item.id.get_offset()
+        if offset is None or item.chunks is not None or item.size == 0 or item.dtype.kind not in 'fiu':
+            return item[()]
+    return np.memmap(path, dtype=item.dtype, mode='r', offset=offset, shape=item.shape)
+
+
+def write_statespace(path, a, b, c, d, dt=None, **attrs):
+    """
+    Writes state-space matrices to an HDF5 file readable with :class:`LazyStateSpace`.
+
+    Dense matrices are written as contiguous datasets such that they can be memory-mapped. Sparse matrices are written
+    in CSR format.
+
+    Args:
+        path (str): Path to the file.
+        a (np.ndarray or scipy.sparse.spmatrix): State matrix.
+        b (np.ndarray or scipy.sparse.spmatrix): Input matrix.
+        c (np.ndarray or scipy.sparse.spmatrix): Output matrix.
+        d (np.ndarray or scipy.sparse.spmatrix): Feedthrough matrix.
+        dt (float (optional)): Time step.
+        **attrs: Attributes of the file.
+    """
+    import h5py as h5
+
+    with h5.File(path, 'w') as f:
+        write_statespace_group(f, a, b, c, d, dt=dt)
+        f.attrs.update(attrs)
+
+
+def write_statespace_group(grp, a, b, c, d, dt=None, compression=None):
+    """
+    Writes state-space matrices to an open HDF5 group, in the layout of :func:`write_statespace`.
+
+    Args:
+        grp (h5py.Group): Group in which to write the matrices.
+        compression (str (optional)): h5py compression filter. Compressed matrices are read rather than
+            memory-mapped by :class:`LazyStateSpace`.
+    """
+    for name, matrix in zip(['a', 'b', 'c', 'd'], [a, b, c, d]):
+        if hasattr(matrix, 'tocsr'):
+            matrix = matrix.tocsr()
+            sub_grp = grp.create_group(name)
+            sub_grp.attrs['shape'] = matrix.shape
+            for field in ['data', 'indices', 'indptr']:
+                _create_dataset(sub_grp, field, getattr(matrix, field), compression)
+        else:
+            _create_dataset(grp, name, np.asarray(matrix), compression)
+    if dt is not None:
+        grp.create_dataset('dt', data=dt)
+
+
+def _create_dataset(grp, name, data, compression):
+    if compression is not None and data.size > 0:
+        grp.create_dataset(name, data=data, chunks=True, compression=compression)
+    else:
+        grp.create_dataset(name, data=data)
+
+
+def state_space(a, b, c, d, dt=None):
+    """
+    SHARPy state-space from its matrices. SHARPy is only imported here, when a state-space is built.
+    """
+    try:
+        import sharpy.linear.src.libss as libss
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError('Please load sharpy')
+    return libss.StateSpace(a, b, c, d, dt=dt)
+
+
 class Statistics:
+    """
+    Output statistics of a system subject to a stochastic input.
+
+    The FRF may hold a single system, of shape ``p x m x wv``, or a stack of systems (i.e. cases) along leading axes,
+    of shape ``... x p x m x wv``, which are processed in a single call.
+
+    Args:
+        input_psd (np.ndarray): Power spectral density of the input, of shape ``wv`` or ``... x wv``.
+        aircraft_frf (np.ndarray): FRF of shape ``... x p x m x wv``.
+        omega_vec (np.ndarray): Frequency vector.
+        chunk_size (int (optional)): Number of frequencies processed at a time. If given, :meth:`run` integrates the
+            covariance directly from the FRF without storing the ``p x p x wv`` output PSD.
+    """
 
-    def __init__(self, input_psd, aircraft_frf, omega_vec):
+    def __init__(self, input_psd, aircraft_frf, omega_vec, chunk_size=None):
 
         self.input_psd = input_psd
         self.aircraft_frf = aircraft_frf
         self.omega_vec = omega_vec
+        self.chunk_size = chunk_size
 
         self.output_psd = None
         self.output_covariance = None
@@ -42,40 +403,58 @@ class Statistics:
         self.correlation = None
 
     def psd(self):
-        self.output_psd = psd(self.input_psd, self.aircraft_frf)
+        self.output_psd = psd(self.input_psd, self.aircraft_frf, chunk_size=self.chunk_size)
         return self.output_psd
 
     def covariance(self):
-        self.output_covariance, self.output_rms = covariance(self.output_psd, self.omega_vec)
+        if self.output_psd is None:
+            self.output_covariance, self.output_rms = frf_covariance(self.input_psd, self.aircraft_frf,
+                                                                     self.omega_vec, chunk_size=self.chunk_size)
+        else:
+            self.output_covariance, self.output_rms = covariance(self.output_psd, self.omega_vec)
 
     def correlation_coefficient(self):
         self.correlation = correlation_matrix(self.output_covariance, self.output_rms)
 
     def run(self):
-        self.psd()
+        if self.chunk_size is None:
+            self.psd()
         self.covariance()
         self.correlation_coefficient()
 
     def probabillity_ellipse(self, output1, output2, x, y):
-        return joint_gaussian_probability(x, y, self.output_rms[output1], self.output_rms[output2],
-                                          self.correlation[output1, output2])
+        return joint_gaussian_probability(x, y, self.output_rms[..., output1], self.output_rms[..., output2],
+                                          self.correlation[..., output1, output2])
 
 
-def psd(input_psd, yfreq):
-    """
+def psd(input_psd, yfreq, chunk_size=None):
+    r"""
     Output Power Spectral Density from Input PSD and aircraft Frequency Response Function
 
+    .. math::
+        \Phi_y(\omega) = H(\omega) \Phi_u(\omega) H^*(\omega)
+
     Args:
-        input_psd (np.array): Power spectral density of input ``wv x 1``
-        yfreq (np.array): FRF with dimensions ``p, m, wv``.
+        input_psd (np.array): Power spectral density of input ``wv`` (or ``... x wv`` for a stack of systems)
+        yfreq (np.array): FRF with dimensions ``p, m, wv`` (or ``..., p, m, wv``).
+        chunk_size (int (optional)): Number of frequencies processed at a time.
 
     Returns:
-        np.array: Output PSD
+        np.array: Complex output PSD of dimensions ``p, p, wv`` (or ``..., p, p, wv``)
     """
+    yfreq = np.asarray(yfreq)
+    input_psd = _input_psd(input_psd, yfreq)
 
-    psd_matrix = np.zeros((yfreq.shape[0], yfreq.shape[0], yfreq.shape[-1]), dtype=float)
-    for i_omega in range(yfreq.shape[-1]):
-        psd_matrix[:, :, i_omega] = input_psd[i_omega] * yfreq[:, :, i_omega].dot(np.conj(yfreq[:, :, i_omega].T))
+    n_omega = yfreq.shape[-1]
+    if chunk_size is None:
+        chunk_size = n_omega
+
+    out_shape = np.broadcast_shapes(yfreq.shape[:-3], input_psd.shape[:-1]) + (yfreq.shape[-3], yfreq.shape[-3], n_omega)
+    psd_matrix = np.zeros(out_shape, dtype=complex)
+    for start in range(0, n_omega, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        psd_matrix[..., chunk] = np.einsum('...pmw,...w,...qmw->...pqw', yfreq[..., chunk], input_psd[..., chunk],
+                                           np.conj(yfreq[..., chunk]))
 
     return psd_matrix
 
@@ -88,24 +467,73 @@ def covariance(psd, omega_vec):
         \Sigma_y = \frac{1}{2} \int_0^\infty (\Phi_y(\omega) + \Phi^\top(\omega)) d\omega
 
     Args:
-        psd (np.ndarray): PSD of shape ``p x p x wv``
+        psd (np.ndarray): PSD of shape ``p x p x wv`` (or ``... x p x p x wv``)
         omega_vec: Frequency Vector
 
     Returns:
         tuple: Tuple containing the covariance and RMS
     """
-    d_omega_covariance = np.array([psd[:, :, i] + psd[:, :, i].T for i in range(psd.shape[-1])])
-    print(d_omega_covariance.shape)
-    covariance = np.zeros((psd.shape[0], psd.shape[0]))
-    for i in range(psd.shape[0]):
-        for j in range(psd.shape[0]):
-            covariance[i, j] = 0.5 * np.trapz(d_omega_covariance[:, i, j], omega_vec)
-    rms = np.sqrt(np.diag(covariance))
-    print(rms)
+    weights = trapezoid_weights(omega_vec)
+    covariance = 0.5 * np.einsum('...pqw,w->...pq', psd + np.swapaxes(psd, -3, -2), weights).real
+    rms = np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1))
 
     return covariance, rms
 
 
+def frf_covariance(input_psd, yfreq, omega_vec, chunk_size=None):
+    r"""
+    Covariance matrix and Root Mean Square integrated directly from the FRF.
+
+    Equivalent to :func:`covariance` of the :func:`psd` but, as the frequencies are processed in chunks, without
+    storing the ``p x p x wv`` output PSD.
+
+    .. math::
+        \Sigma_y = \int_0^\infty \Re\left(H(\omega) \Phi_u(\omega) H^*(\omega)\right) d\omega
+
+    Args:
+        input_psd (np.array): Power spectral density of input ``wv`` (or ``... x wv`` for a stack of systems)
+        yfreq (np.array): FRF with dimensions ``p, m, wv`` (or ``..., p, m, wv``).
+        omega_vec: Frequency Vector
+        chunk_size (int (optional)): Number of frequencies processed at a time.
+
+    Returns:
+        tuple: Tuple containing the covariance and RMS
+    """
+    yfreq = np.asarray(yfreq)
+    weighted_psd = _input_psd(input_psd, yfreq) * trapezoid_weights(omega_vec)
+
+    n_omega = yfreq.shape[-1]
+    if chunk_size is None:
+        chunk_size = n_omega
+
+    covariance = 0
+    for start in range(0, n_omega, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        covariance = covariance + np.einsum('...pmw,...w,...qmw->...pq', yfreq[..., chunk], weighted_psd[..., chunk],
+                                            np.conj(yfreq[..., chunk])).real
+    rms = np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1))
+
+    return covariance, rms
+
+
+def trapezoid_weights(omega_vec):
+    """
+    Weights of the trapezoidal rule, such that ``np.trapz(y, omega_vec) == y.dot(weights)``.
+    """
+    d_omega = np.diff(omega_vec)
+    weights = np.zeros(len(omega_vec))
+    weights[:-1] += 0.5 * d_omega
+    weights[1:] += 0.5 * d_omega
+    return weights
+
+
+def _input_psd(input_psd, yfreq):
+    input_psd = np.asarray(input_psd)
+    if input_psd.ndim > 1 and input_psd.shape[-1] == 1 and input_psd.shape[-2] == yfreq.shape[-1]:
+        input_psd = input_psd[..., 0]  # column vector ``wv x 1``
+    return input_psd
+
+
 def correlation_matrix(covariance_matrix, rms):
     """
     Provides the correlation coefficients from the covariance matrix and the RMS.
@@ -117,12 +545,7 @@ def correlation_matrix(covariance_matrix, rms):
     Returns:
         np.array: Correlation coefficient matrix
     """
-    corr_coeff = np.zeros_like(covariance_matrix)
-    for i in range(covariance_matrix.shape[0]):
-        for j in range(covariance_matrix.shape[0]):
-            corr_coeff[i, j] = covariance_matrix[i, j] / rms[i] / rms[j]
-
-    return corr_coeff
+    return covariance_matrix / rms[..., :, None] / rms[..., None, :]
 
 
 def joint_gaussian_probability(x, y, rms_x, rms_y, corr_coeff):
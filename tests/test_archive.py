@@ -0,0 +1,62 @@
+import numpy as np
+import scipy.sparse as sp
+from batch.sets import Actual
+from benchmarks import synthetic
+from linear.statespace import LazyStateSpace, dense, write_statespace
+
+
+def assert_same(loaded, original):
+    if original is None:
+        assert loaded is None
+    else:
+        np.testing.assert_array_equal(np.squeeze(loaded), np.squeeze(original))
+
+
+def test_archive_round_trip(tmp_path):
+    pattern = synthetic.generate_tree(str(tmp_path / 'cases'), n_cases=4, n_nodes=5, n_eigs=6, n_freq=8,
+                                      n_states=4)
+    actual = Actual(pattern)
+    actual.load_bulk_cases('eigs', 'bode', 'deflection', 'forces', 'ss', lazy=False)
+
+    # single and multiple row tables, a sparse state-space and missing data
+    cases = actual.aeroelastic.cases
+    cases[1].aero_forces = np.vstack((cases[1].aero_forces, 2 * cases[1].aero_forces))
+    sparse_path = str(tmp_path / 'sparse.h5')
+    write_statespace(sparse_path, sp.csc_matrix(-np.eye(4)), np.ones((4, 2)), np.ones((3, 4)), np.zeros((3, 2)),
+                     dt=0.1)
+    cases[2].ss = LazyStateSpace(sparse_path)
+    cases[3].eigs = None
+    cases[3].bode = None
+
+    archive = str(tmp_path / 'sweep.h5')
+    actual.save_archive(archive)
+    loaded = Actual(pattern)
+    loaded.load_archive(archive)
+
+    for sys in actual.systems:
+        original_set = actual.cases[sys]
+        loaded_set = loaded.cases[sys]
+        assert loaded_set.n_cases == original_set.n_cases
+        assert loaded_set.parameters.names == original_set.parameters.names
+        np.testing.assert_array_equal(loaded_set.parameters.values, original_set.parameters.values)
+
+        for original, case in zip(original_set.cases, loaded_set.cases):
+            assert case.name == original.name
+            assert case.path == original.path
+            assert dict(case.path_to_sys) == dict(original.path_to_sys)
+            for name in ['eigs', 'deflection', 'crv', 'aero_forces']:
+                assert_same(getattr(case, '_' + name), getattr(original, '_' + name))
+
+            if original._bode is None:
+                assert case._bode is None
+            else:
+                np.testing.assert_array_equal(case.bode.wv, original.bode.wv)
+                np.testing.assert_array_equal(case.bode.yfreq, original.bode.yfreq[()])
+
+            assert case.ss.dt == original.ss.dt
+            for matrix in ['A', 'B', 'C', 'D']:
+                np.testing.assert_array_equal(dense(getattr(case.ss, matrix)), dense(getattr(original.ss, matrix)))
+
+    assert sp.issparse(loaded.aeroelastic(2).ss.A)
+    assert loaded.aeroelastic(1).aero_forces.shape == (2, 13)
+    assert loaded.aeroelastic(0).aero_forces.shape == (1, 13)
@@ -0,0 +1,85 @@
+import concurrent.futures
+import os
+import numpy as np
+from individual.cache import CaseCache
+from individual.case import Case
+
+
+def write_eigs(path, eigs, mtime_ns=None):
+    np.savetxt(path, eigs)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def eigs_case(case_dir, cache):
+    return Case([10.], 'aeroelastic', str(case_dir), cache=cache,
+                path_templates={'eigs': '{path}/eigenvalues.dat'})
+
+
+def test_put_get(tmp_path):
+    source = str(tmp_path / 'eigenvalues.dat')
+    write_eigs(source, np.ones((3, 2)))
+    cache = CaseCache(str(tmp_path / 'cache'))
+
+    assert cache.get('eigs', source, [source]) is None
+    assert cache.put('eigs', source, [source], eigs=np.ones((3, 2)))
+    np.testing.assert_array_equal(cache.get('eigs', source, [source])['eigs'], np.ones((3, 2)))
+    assert cache.get('bode', source, [source]) is None
+
+
+def test_changed_source_is_read_again(tmp_path):
+    source = str(tmp_path / 'eigenvalues.dat')
+    write_eigs(source, np.ones((3, 2)), mtime_ns=10 ** 18)
+    cache = CaseCache(str(tmp_path / 'cache'))
+
+    np.testing.assert_array_equal(eigs_case(tmp_path, cache).eigs, np.ones((3, 2)))
+    assert cache.get('eigs', source, [source]) is not None
+
+    write_eigs(source, 2 * np.ones((4, 2)), mtime_ns=2 * 10 ** 18)
+    assert cache.get('eigs', source, [source]) is None
+    np.testing.assert_array_equal(eigs_case(tmp_path, cache).eigs, 2 * np.ones((4, 2)))
+
+    # same size, only the modification time changes
+    write_eigs(source, 3 * np.ones((4, 2)), mtime_ns=3 * 10 ** 18)
+    np.testing.assert_array_equal(eigs_case(tmp_path, cache).eigs, 3 * np.ones((4, 2)))
+
+
+def test_missing_source(tmp_path):
+    source = str(tmp_path / 'eigenvalues.dat')
+    write_eigs(source, np.ones((3, 2)))
+    cache = CaseCache(str(tmp_path / 'cache'))
+    cache.put('eigs', source, [source], eigs=np.ones((3, 2)))
+
+    os.remove(source)
+    assert cache.get('eigs', source, [source]) is None
+
+
+def test_eviction(tmp_path):
+    cache = CaseCache(str(tmp_path / 'cache'), max_size=10 * 1024)
+    sources = []
+    for i_source in range(20):
+        source = str(tmp_path / 'eigs{:d}.dat'.format(i_source))
+        write_eigs(source, np.ones((1, 2)))
+        cache.put('eigs', source, [source], eigs=np.random.default_rng(i_source).random(128))
+        if os.path.exists(cache.entry('eigs', source)):
+            # distinct access times, oldest first
+            os.utime(cache.entry('eigs', source), ns=(i_source * 10 ** 9, i_source * 10 ** 9))
+        sources.append(source)
+
+    assert cache.size() <= cache.max_size
+    assert cache.get('eigs', sources[-1], [sources[-1]]) is not None
+    assert cache.get('eigs', sources[0], [sources[0]]) is None
+
+
+def test_concurrent_writes_of_an_entry(tmp_path):
+    source = str(tmp_path / 'eigenvalues.dat')
+    write_eigs(source, np.ones((3, 2)))
+    cache = CaseCache(str(tmp_path / 'cache'))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        written = list(executor.map(lambda i: cache.put('eigs', source, [source], eigs=np.full(1000, i)),
+                                    range(64)))
+
+    assert all(written)
+    assert cache.get('eigs', source, [source])['eigs'].shape == (1000,)
+    assert not [name for name in os.listdir(cache.path) if name.endswith('.tmp.npz')]
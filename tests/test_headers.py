@@ -0,0 +1,106 @@
+import configobj
+import numpy as np
+import pytest
+from batch.headers import HeaderSyntaxError, SOURCE_SECTIONS, parameter_table, parse_header, read_header
+
+SOURCE_HEADER = """\
+[parameters]
+u_inf = 10
+alpha = 1.5e-1
+[sim_info]
+path_to_data = /home/user/sharpy_cases/case000/
+case = case000
+"""
+
+EDGE_HEADER = """\
+# written by SHARPy
+
+[ parameters ]
+    u_inf=10    # m/s
+  alpha   =   -2.
+rho = 1.225#kg/m3
+empty =
+
+[sim_info]
+path_to_data = ./output/case_1/
+case = case_1
+"""
+
+OTHER_SECTIONS_HEADER = """\
+[settings]
+flow = BeamLoader, AerogridLoader
+[[BeamLoader]]
+unsteady = 'on'
+[parameters]
+u_inf = 10
+[sim_info]
+case = case000
+path_to_data = ./case000/
+"""
+
+SUMMARY = """\
+[case0]
+u_inf = 10
+alpha = 1
+[case1]
+u_inf = 12.5
+alpha = 1
+"""
+
+FALLBACK_HEADERS = {
+    'list': "[parameters]\nu_inf = 10, 11\n",
+    'quoted': "[parameters]\nu_inf = 10\n[sim_info]\ncase = 'case 0'\n",
+    'subsection': "[parameters]\nu_inf = 10\n[[nested]]\nalpha = 1\n",
+    'triple quoted': '[sim_info]\ncase = """case\n0"""\n',
+}
+
+
+def write(tmp_path, text, name='case.pmor.sharpy'):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def as_dict(header, sections=None):
+    return {name: dict(section) for name, section in header.items() if sections is None or name in sections}
+
+
+@pytest.mark.parametrize('text', [SOURCE_HEADER, EDGE_HEADER, SUMMARY])
+def test_parse_header_matches_configobj(tmp_path, text):
+    path = write(tmp_path, text)
+    header = parse_header(path)
+
+    assert as_dict(header) == as_dict(configobj.ConfigObj(path))
+    assert header.filename == path
+
+
+@pytest.mark.parametrize('text', [SOURCE_HEADER, EDGE_HEADER, OTHER_SECTIONS_HEADER])
+def test_parse_header_sections_match_configobj(tmp_path, text):
+    path = write(tmp_path, text)
+    header = parse_header(path, SOURCE_SECTIONS)
+
+    assert list(header.keys()) == [name for name in configobj.ConfigObj(path) if name in SOURCE_SECTIONS]
+    assert as_dict(header) == as_dict(configobj.ConfigObj(path), SOURCE_SECTIONS)
+
+
+@pytest.mark.parametrize('kind', FALLBACK_HEADERS)
+def test_read_header_falls_back_to_configobj(tmp_path, kind):
+    path = write(tmp_path, FALLBACK_HEADERS[kind])
+
+    with pytest.raises(HeaderSyntaxError):
+        parse_header(path)
+    header = read_header(path)
+    assert isinstance(header, configobj.ConfigObj)
+    assert header == configobj.ConfigObj(path)
+
+
+def test_parameter_table(tmp_path):
+    headers = [parse_header(write(tmp_path, SOURCE_HEADER.replace('u_inf = 10', 'u_inf = {:g}'.format(u_inf)),
+                                  name='case{:g}.pmor.sharpy'.format(u_inf)))
+               for u_inf in [10, 12, 11]]
+
+    table = parameter_table(headers + [None])
+
+    assert table.names == ['u_inf', 'alpha']
+    np.testing.assert_array_equal(table.values, [[10, 0.15], [12, 0.15], [11, 0.15]])
+    assert table.find([11, 0.15]) == 2